@@ -8,14 +8,14 @@ Snapcast groups via JSON-RPC API.
 
 Deployment steps:
   1. Generate ALSA config (per-channel, room, and all_rooms PCM devices)
+     and Snapcast server config (stream sources) in parallel
   2. Install to /etc/asound.conf (requires sudo)
-  3. Generate Snapcast server config (stream sources)
-  4. Install to /etc/snapserver.conf (requires sudo)
-  5. Install service templates (snapclient, sendspin)
-  6. Restart snapserver service
-  7. Restart snapclient and sendspin services for all rooms
-  8. Wait for snapclients to connect (timeout: 30s)
-  9. Configure Snapcast groups via JSON-RPC API based on stream_targets
+  3. Install to /etc/snapserver.conf (requires sudo)
+  4. Install service templates (snapclient, sendspin)
+  5. Restart snapserver service
+  6. Restart snapclient and sendspin services for all rooms
+  7. Wait for snapclients to connect (timeout: 30s)
+  8. Configure Snapcast groups via JSON-RPC API based on stream_targets
 
 Prerequisites:
   - speaker_config.json must exist (run speaker_identify.py first)
@@ -41,20 +41,53 @@ After deployment, test with:
   aplay -D room_<roomname> /usr/share/sounds/alsa/Front_Center.wav
 """
 
+import hashlib
 import json
+import random
+import select
 import socket
 import subprocess
 import sys
 import time
+from collections import defaultdict
 from pathlib import Path
 
 CONFIG_FILE = Path(__file__).parent / "speaker_config.json"
 SERVICES_DIR = Path(__file__).parent / "services"
 SNAPCAST_HOST = "localhost"
 SNAPCAST_PORT = 1705  # TCP JSON-RPC port
+SNAPCAST_READ_BUFFER = 65536
+SNAPSERVER_READY_TIMEOUT = 5  # seconds to wait for snapserver after a restart
 SNAPSERVER_CONF = "/etc/snapserver.conf"
 ASOUND_CONF = "/etc/asound.conf"
 SYSTEMD_DIR = "/etc/systemd/system"
+GENERATOR_SCRIPTS = [
+    Path(__file__).parent / "generate_alsa_config.py",
+    Path(__file__).parent / "generate_snapserver_conf.py",
+]
+DEPLOY_CACHE = Path.home() / ".cache" / "snappy" / "deploy_cache.json"
+
+# wait_for_clients polling: exponential backoff (seconds)
+POLL_INITIAL_DELAY = 0.1
+POLL_BACKOFF = 1.3
+POLL_MAX_DELAY = 2.0
+
+# Compact JSON-RPC framing: no whitespace after separators, one request per
+# line. orjson (when installed) encodes and parses the replies - including
+# the full Server.GetStatus dump - several times faster than the stdlib.
+try:
+    import orjson
+
+    _rpc_loads = orjson.loads
+
+    def _rpc_dumps(payload) -> bytes:
+        return orjson.dumps(payload)
+except ImportError:
+    _rpc_loads = json.loads
+    _rpc_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+    def _rpc_dumps(payload) -> bytes:
+        return _rpc_encode(payload).encode()
 
 
 def load_config() -> dict:
@@ -73,38 +106,116 @@ def run_command(cmd: list, check: bool = True) -> subprocess.CompletedProcess:
     return subprocess.run(cmd, capture_output=True, text=True, check=check)
 
 
-def generate_alsa_config() -> str:
-    """Generate ALSA configuration."""
-    result = run_command(["python3", str(Path(__file__).parent / "generate_alsa_config.py")])
-    return result.stdout
+def run_commands_parallel(cmds: list) -> list:
+    """Run several commands concurrently and return their stdout, in order."""
+    procs = []
+    for cmd in cmds:
+        print(f"  Running: {' '.join(cmd)}")
+        procs.append(subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True))
+
+    outputs = []
+    for cmd, proc in zip(cmds, procs):
+        stdout, stderr = proc.communicate()
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd, stdout, stderr)
+        outputs.append(stdout)
+    return outputs
 
 
-def generate_snapserver_config() -> str:
-    """Generate Snapcast server configuration."""
-    result = run_command(["python3", str(Path(__file__).parent / "generate_snapserver_conf.py")])
-    return result.stdout
+def config_hash() -> str:
+    """Hash speaker_config.json together with the generator scripts."""
+    digest = hashlib.sha256()
+    for path in (CONFIG_FILE, *GENERATOR_SCRIPTS):
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def generate_configs() -> tuple:
+    """Generate ALSA and Snapcast server configuration (concurrently).
+
+    The output is cached keyed by config_hash(), so a redeploy without changes
+    to speaker_config.json or the generators skips both subprocesses.
+    """
+    digest = config_hash()
+    try:
+        cache = json.loads(DEPLOY_CACHE.read_text())
+    except (OSError, ValueError):
+        cache = {}
+    if cache.get("hash") == digest:
+        print("  Configuration unchanged since last deploy, using cached output")
+        return cache["alsa"], cache["snapserver"]
+
+    alsa_config, snap_config = run_commands_parallel([
+        ["python3", str(script)] for script in GENERATOR_SCRIPTS
+    ])
 
+    try:
+        DEPLOY_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        DEPLOY_CACHE.write_text(json.dumps({
+            "hash": digest,
+            "alsa": alsa_config,
+            "snapserver": snap_config,
+        }))
+    except OSError as e:
+        print(f"  Warning: could not write {DEPLOY_CACHE}: {e}")
+    return alsa_config, snap_config
+
+
+def install_config(content: str, path: str) -> bool:
+    """Install configuration file (requires sudo). Returns True if it changed."""
+    try:
+        if Path(path).read_text() == content:
+            print(f"  {path} unchanged, skipping")
+            return False
+    except OSError:
+        pass
 
-def install_config(content: str, path: str):
-    """Install configuration file (requires sudo)."""
     print(f"  Installing {path}")
     proc = subprocess.Popen(
         ["sudo", "tee", path],
         stdin=subprocess.PIPE,
         stdout=subprocess.DEVNULL,
-        text=True
+        bufsize=1 << 16,
     )
-    proc.communicate(input=content)
+    # Stream straight into tee's stdin; tee writes to disk while we feed it
+    try:
+        proc.stdin.write(content.encode())
+        proc.stdin.close()
+    except BrokenPipeError:
+        pass
+    proc.wait()
     if proc.returncode != 0:
         print(f"Error: Failed to install {path}")
         sys.exit(1)
-
-
-def restart_snapserver():
-    """Restart the snapserver service."""
+    return True
+
+
+def wait_for_snapserver(snapcast: "SnapcastClient", timeout: float = SNAPSERVER_READY_TIMEOUT) -> bool:
+    """Wait until snapserver accepts connections on its JSON-RPC port.
+
+    Probes with exponential backoff (50 ms growing to 500 ms) instead of
+    sleeping a fixed time, so a fast restart isn't padded out and a slow one
+    isn't cut short. The probe connects `snapcast` itself, so the connection
+    is reused by the polling and group configuration that follow.
+    """
+    delay = 0.05
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            snapcast.connect()
+            return True
+        except OSError:
+            time.sleep(delay)
+            delay = min(delay * 1.5, 0.5)
+    return False
+
+
+def restart_snapserver(snapcast: "SnapcastClient"):
+    """Restart the snapserver service and wait until it is reachable."""
     print("  Restarting snapserver...")
     run_command(["sudo", "systemctl", "restart", "snapserver"])
-    time.sleep(2)  # Give it time to start
+    if not wait_for_snapserver(snapcast):
+        print(f"  Warning: snapserver not reachable after {SNAPSERVER_READY_TIMEOUT}s")
 
 
 def install_service_templates():
@@ -133,77 +244,290 @@ def restart_room_services(rooms: list):
         run_command(["sudo", "systemctl", "enable", "--now", service], check=False)
 
 
-def snapcast_request(method: str, params: dict = None) -> dict:
-    """Send a JSON-RPC request to Snapcast server."""
-    request = {
-        "id": 1,
-        "jsonrpc": "2.0",
-        "method": method,
-    }
-    if params:
-        request["params"] = params
-
-    try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(5)
-        sock.connect((SNAPCAST_HOST, SNAPCAST_PORT))
-        sock.sendall((json.dumps(request) + "\r\n").encode())
-
-        response = b""
+class SnapcastClient:
+    """Persistent JSON-RPC connection to the Snapcast server.
+
+    The TCP connection is opened on first use and reused for every request of
+    the deployment run (status polling, client naming, group assignment)
+    instead of reconnecting per call. A dropped connection is re-established
+    once per request.
+    """
+
+    def __init__(self, host: str = SNAPCAST_HOST, port: int = SNAPCAST_PORT, timeout: float = 5):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._next_id = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def connect(self):
+        """Open the connection to the Snapcast server."""
+        self.close()
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        # Small request -> small reply: don't let Nagle hold requests back
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+        # Replies are newline-framed; a large buffered reader lets readline()
+        # pull a whole Server.GetStatus reply in as few recv() calls as possible
+        self._reader = sock.makefile("rb", buffering=SNAPCAST_READ_BUFFER)
+
+    def close(self):
+        """Close the connection (the next request reconnects)."""
+        if self._reader:
+            try:
+                self._reader.close()
+            except OSError:
+                pass
+        if self._sock:
+            self._sock.close()
+        self._sock = None
+        self._reader = None
+
+    def _write(self, data: bytes):
+        if self._sock is None:
+            self.connect()
+        self._sock.sendall(data)
+        if hasattr(socket, "TCP_QUICKACK"):
+            # Linux only, and not sticky: re-arm so the reply is ACKed immediately
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+
+    def _read_reply(self) -> object:
+        """Read the next JSON-RPC reply, skipping server notifications."""
         while True:
-            chunk = sock.recv(4096)
-            if not chunk:
+            line = self._reader.readline()
+            if not line:
+                raise ConnectionError("connection closed by server")
+            reply = _rpc_loads(line)  # bytes in, trailing \r\n is JSON whitespace
+            # Notifications (e.g. Client.OnNameChanged) carry a method but no id
+            if isinstance(reply, dict) and "method" in reply and "id" not in reply:
+                continue
+            return reply
+
+    def _exchange(self, payload) -> object:
+        """Send one JSON-RPC payload (object or batch array) and return the parsed reply."""
+        data = self._frame(payload)
+        try:
+            self._write(data)
+            return self._read_reply()
+        except OSError:
+            # Stale connection (e.g. snapserver restarted) - reconnect once
+            self.close()
+            self._write(data)
+            return self._read_reply()
+
+    @staticmethod
+    def _frame(payload) -> bytes:
+        """Encode one JSON-RPC payload as a compact, CRLF-terminated line."""
+        return _rpc_dumps(payload) + b"\r\n"
+
+    def _make_request(self, method: str, params: dict = None) -> dict:
+        request = {
+            "id": self._next_id,
+            "jsonrpc": "2.0",
+            "method": method,
+        }
+        self._next_id += 1
+        if params:
+            request["params"] = params
+        return request
+
+    def request(self, method: str, params: dict = None) -> dict:
+        """Send a JSON-RPC request to Snapcast server."""
+        try:
+            return self._exchange(self._make_request(method, params))
+        except (OSError, ValueError) as e:
+            self.close()
+            print(f"  Snapcast API error: {e}")
+            return None
+
+    def batch(self, calls: list) -> list:
+        """Send several JSON-RPC calls to Snapcast server as one batch request.
+
+        `calls` is a list of (method, params) tuples. Returns the responses in
+        the same order as `calls` (matched by id); a call without a response
+        maps to None. Falls back to pipelined requests if the server rejects
+        batches.
+        """
+        if not calls:
+            return []
+
+        batch = [self._make_request(method, params) for method, params in calls]
+
+        try:
+            response = self._exchange(batch)
+        except (OSError, ValueError) as e:
+            self.close()
+            print(f"  Snapcast API error: {e}")
+            return [None] * len(calls)
+
+        # A server without batch support answers with a single error object
+        if not isinstance(response, list):
+            code = (response or {}).get("error", {}).get("code")
+            if code in (-32600, -32601):
+                return self.pipeline(calls)
+            return [None] * len(calls)
+
+        by_id = {r.get("id"): r for r in response if isinstance(r, dict)}
+        return [by_id.get(request["id"]) for request in batch]
+
+    def pipeline(self, calls: list) -> list:
+        """Send several JSON-RPC calls back-to-back without waiting in between.
+
+        All requests are written to the connection first, then the replies are
+        read and matched by id (the server may answer out of order), so the
+        calls cost about one round-trip in total. Returns the responses in the
+        same order as `calls`; a call without a response maps to None.
+        """
+        if not calls:
+            return []
+
+        requests = [self._make_request(method, params) for method, params in calls]
+        data = b"".join(self._frame(request) for request in requests)
+
+        by_id = {}
+        try:
+            self._write(data)
+            for _ in requests:
+                reply = self._read_reply()
+                if isinstance(reply, dict):
+                    by_id[reply.get("id")] = reply
+        except (OSError, ValueError) as e:
+            self.close()
+            print(f"  Snapcast API error: {e}")
+
+        return [by_id.get(request["id"]) for request in requests]
+
+    def _readable_now(self) -> bool:
+        """True if a read would return data (or EOF) without blocking.
+
+        Looks at the reader's buffer as well as the socket: a reply can pull
+        in notifications behind it, which select() on the socket can't see.
+        """
+        self._sock.setblocking(False)
+        try:
+            return bool(self._reader.peek(1))
+        except OSError:
+            return True  # let the read report the error
+        finally:
+            self._sock.settimeout(self.timeout)
+
+    def wait_for_notification(self, methods: tuple, timeout: float) -> bool:
+        """Block up to `timeout` seconds for a server notification in `methods`.
+
+        Returns True as soon as one arrives (other notifications are
+        discarded), False on timeout. Only call while no request is waiting
+        for its reply. Without a connection this just sleeps.
+        """
+        deadline = time.monotonic() + timeout
+        while self._sock is not None:
+            if not self._readable_now():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                readable, _, _ = select.select([self._sock], [], [], remaining)
+                if not readable:
+                    return False
+            try:
+                line = self._reader.readline()
+            except OSError:
+                line = b""
+            if not line:
+                self.close()  # the next request reconnects
                 break
-            response += chunk
-            if b"\r\n" in response:
-                break
-
-        sock.close()
-        return json.loads(response.decode().strip())
-    except Exception as e:
-        print(f"  Snapcast API error: {e}")
+            try:
+                message = _rpc_loads(line)
+            except ValueError:
+                continue
+            if isinstance(message, dict) and message.get("method") in methods:
+                return True
+        time.sleep(max(0, deadline - time.monotonic()))
+        return False
+
+    def get_status(self) -> dict:
+        """Get current Snapcast server status."""
+        response = self.request("Server.GetStatus")
+        if response and "result" in response:
+            return response["result"]["server"]
         return None
 
 
-def get_snapcast_status() -> dict:
-    """Get current Snapcast server status."""
-    response = snapcast_request("Server.GetStatus")
-    if response and "result" in response:
-        return response["result"]["server"]
-    return None
+def wait_for_clients(snapcast: SnapcastClient, expected_rooms: list, timeout: int = 30) -> dict:
+    """Wait for expected clients to connect.
 
+    Polls immediately, then backs off exponentially (with jitter) from
+    POLL_INITIAL_DELAY up to POLL_MAX_DELAY. The delay resets whenever more
+    clients show up, and once clients are arriving the observed rate is used
+    to estimate when the rest will be up, polling more densely when that is
+    close. If no client at all has connected after a third of the timeout,
+    gives up early instead of burning the full timeout.
 
-def wait_for_clients(expected_rooms: list, timeout: int = 30) -> dict:
-    """Wait for expected clients to connect."""
+    Between polls it listens for snapserver's Client.OnConnect notification
+    on the open connection, so a client that connects mid-delay is picked up
+    right away rather than at the next scheduled poll.
+    """
     print(f"  Waiting for {len(expected_rooms)} clients to connect...")
 
+    expected = set(expected_rooms)
     start = time.time()
+    delay = POLL_INITIAL_DELAY
+    connected = set()
+    missing = expected
+    last_progress = start
     while time.time() - start < timeout:
-        status = get_snapcast_status()
-        if not status:
-            time.sleep(1)
-            continue
-
-        # Get all connected client names
-        connected = set()
-        for group in status.get("groups", []):
-            for client in group.get("clients", []):
-                config = client.get("config", {})
-                name = config.get("name", "")
-                if name:
-                    connected.add(name)
-
-        # Check if all expected rooms have clients
-        missing = set(expected_rooms) - connected
-        if not missing:
-            print(f"  All {len(expected_rooms)} clients connected!")
-            return status
-
-        time.sleep(1)
+        status = snapcast.get_status()
+        if status:
+            # Get all connected client names
+            previous = len(connected)
+            connected = {
+                name
+                for group in status.get("groups", [])
+                for client in group.get("clients", [])
+                if (name := client.get("config", {}).get("name"))
+            }
+
+            # Check if all expected rooms have clients
+            missing = expected - connected
+            if not missing:
+                print(f"  All {len(expected_rooms)} clients connected!")
+                return status
+
+            if len(connected) != previous:
+                delay = POLL_INITIAL_DELAY  # progress observed, poll closely again
+                last_progress = time.time()
+
+        elapsed = time.time() - start
+        remaining = timeout - elapsed
+        arrived = len(expected) - len(missing)
+        if not arrived:
+            if elapsed >= timeout / 3:
+                print(f"  No clients connected after {elapsed:.0f}s, giving up early "
+                      "(check the snapclient services)")
+                break
+        else:
+            # Extrapolate from the arrival rate so far; poll densely while the
+            # next arrivals are due soon, and let the backoff grow once overdue
+            eta = len(missing) * (last_progress - start) / arrived - (time.time() - last_progress)
+            if 0 < eta < remaining:
+                delay = min(delay, max(POLL_INITIAL_DELAY, eta / 2))
+
+        wait = max(0, min(delay + random.uniform(0, delay * 0.1), POLL_MAX_DELAY, remaining))
+        if snapcast.wait_for_notification(("Client.OnConnect",), wait):
+            delay = POLL_INITIAL_DELAY
+        else:
+            delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
+    else:
+        print("  Timeout waiting for clients.")
 
-    missing = set(expected_rooms) - connected if connected else set(expected_rooms)
-    print(f"  Timeout waiting for clients. Missing: {missing}")
-    return get_snapcast_status()
+    print(f"  Missing: {missing}")
+    return snapcast.get_status()
 
 
 def get_snapcast_stream_name(stream_id: str, stream_config: dict) -> str:
@@ -221,11 +545,26 @@ def get_snapcast_stream_name(stream_id: str, stream_config: dict) -> str:
         return name if name != stream_id else stream_id
 
 
-def resolve_stream_rooms(config: dict, stream_id: str) -> set:
-    """Resolve which rooms should be assigned to a stream based on stream_targets."""
+def build_zone_index(rooms: dict) -> dict:
+    """Build a zone_id -> [room_ids] index from the rooms' zone memberships."""
+    zone_to_rooms = defaultdict(list)
+    for room_id, room_info in rooms.items():
+        for zone_id in room_info.get("zones", []):
+            zone_to_rooms[zone_id].append(room_id)
+    return zone_to_rooms
+
+
+def resolve_stream_rooms(config: dict, stream_id: str, zone_to_rooms: dict = None) -> set:
+    """Resolve which rooms should be assigned to a stream based on stream_targets.
+
+    Pass a prebuilt `zone_to_rooms` index (see build_zone_index) when resolving
+    several streams so the rooms aren't rescanned for every zone.
+    """
     stream_targets = config.get("snapcast", {}).get("stream_targets", {})
     zones = config.get("zones", {})
     rooms = config.get("rooms", {})
+    if zone_to_rooms is None:
+        zone_to_rooms = build_zone_index(rooms)
 
     targets = stream_targets.get(stream_id, {})
     target_zones = targets.get("zones", [])
@@ -236,15 +575,12 @@ def resolve_stream_rooms(config: dict, stream_id: str) -> set:
         zone_info = zones.get(zone_id, {})
         if zone_info.get("include_all"):
             return set(rooms.keys())
-        # Find rooms in this zone
-        for room_id, room_info in rooms.items():
-            if zone_id in room_info.get("zones", []):
-                target_rooms.add(room_id)
+        target_rooms.update(zone_to_rooms.get(zone_id, ()))
 
     return target_rooms
 
 
-def configure_snapcast_groups(config: dict, status: dict):
+def configure_snapcast_groups(snapcast: SnapcastClient, config: dict, status: dict):
     """Configure Snapcast groups based on stream_targets."""
     if not status:
         print("  No Snapcast status available, skipping group configuration")
@@ -262,59 +598,87 @@ def configure_snapcast_groups(config: dict, status: dict):
             client_id = client.get("id", "")
             client_to_group[client_id] = group["id"]
 
+    # Index room -> [(client_id, suffix)] in one pass over the clients; shared
+    # by the naming and assignment passes. suffix is None for the room's own
+    # client and e.g. "Left" for cross-device clients (room_kueche_left).
+    room_clients = {room_id: [] for room_id in rooms}
+    for client_id in client_to_group:
+        if not client_id.startswith("room_"):
+            continue
+        room_id = client_id[len("room_"):]
+        if room_id in room_clients:
+            room_clients[room_id].append((client_id, None))
+            continue
+        # Room ids may contain underscores: try the longest matching prefix
+        while "_" in room_id:
+            room_id = room_id.rpartition("_")[0]
+            if room_id in room_clients:
+                suffix = client_id.rpartition("_")[2].title()
+                room_clients[room_id].append((client_id, suffix))
+                break
+
     # Set client names based on room display names
     print("\n  Setting client names...")
+    name_calls = []
     for room_id, room_info in rooms.items():
         room_display_name = room_info.get("name", room_id.title())
-        # Find clients for this room
-        for client_id in client_to_group.keys():
-            if client_id == f"room_{room_id}":
-                snapcast_request("Client.SetName", {"id": client_id, "name": room_display_name})
+        for client_id, suffix in room_clients[room_id]:
+            if suffix is None:
+                name_calls.append(("Client.SetName", {"id": client_id, "name": room_display_name}))
                 print(f"    {client_id} -> '{room_display_name}'")
-            elif client_id.startswith(f"room_{room_id}_"):
+            else:
                 # Cross-device client (e.g., room_kueche_left)
-                suffix = client_id.split("_")[-1].title()
                 client_name = f"{room_display_name} {suffix}"
-                snapcast_request("Client.SetName", {"id": client_id, "name": client_name})
+                name_calls.append(("Client.SetName", {"id": client_id, "name": client_name}))
                 print(f"    {client_id} -> '{client_name}'")
+    snapcast.batch(name_calls)
+
+    # Friendly Snapcast name per stream, computed once
+    stream_names = {
+        stream_id: get_snapcast_stream_name(stream_id, stream_config)
+        for stream_id, stream_config in streams.items()
+    }
 
     # Build room -> stream map using stream_targets (with friendly names)
+    zone_to_rooms = build_zone_index(rooms)
     room_to_stream = {}
-    for stream_id, stream_config in streams.items():
-        snapcast_name = get_snapcast_stream_name(stream_id, stream_config)
-        target_rooms = resolve_stream_rooms(config, stream_id)
+    for stream_id in streams:
+        snapcast_name = stream_names[stream_id]
+        target_rooms = resolve_stream_rooms(config, stream_id, zone_to_rooms)
         for room_id in target_rooms:
             # Later streams override earlier ones (allows specific overrides)
             room_to_stream[room_id] = snapcast_name
 
     # Get default stream name
-    default_stream_config = streams.get("default", {"type": "pipe"})
-    default_stream_name = get_snapcast_stream_name("default", default_stream_config)
+    if "default" in stream_names:
+        default_stream_name = stream_names["default"]
+    else:
+        default_stream_name = get_snapcast_stream_name("default", {"type": "pipe"})
 
     # For each room, assign to target stream and set group name
     print(f"\n  Assigning {len(rooms)} rooms to streams...")
 
+    # Current stream per group, so groups already on their target are left alone
+    group_stream = {group["id"]: group.get("stream_id") for group in status.get("groups", [])}
     groups_named = set()
+    group_calls = []
     for room_id, room_info in rooms.items():
         target_stream = room_to_stream.get(room_id, default_stream_name)
         room_display_name = room_info.get("name", room_id.title())
 
-        # Find all clients for this room (including _left/_right for cross-device)
-        room_clients = []
-        for client_id in client_to_group.keys():
-            if client_id == f"room_{room_id}" or client_id.startswith(f"room_{room_id}_"):
-                room_clients.append(client_id)
-
-        for client_id in room_clients:
+        for client_id, _ in room_clients[room_id]:
             group_id = client_to_group.get(client_id)
             if group_id:
-                # Set stream for the group
-                snapcast_request("Group.SetStream", {"id": group_id, "stream_id": target_stream})
+                # Set stream for the group (once, and only if it changes)
+                if group_stream.get(group_id) != target_stream:
+                    group_calls.append(("Group.SetStream", {"id": group_id, "stream_id": target_stream}))
+                    group_stream[group_id] = target_stream
                 # Set group name to match room display name (only once per group)
                 if group_id not in groups_named:
-                    snapcast_request("Group.SetName", {"id": group_id, "name": room_display_name})
+                    group_calls.append(("Group.SetName", {"id": group_id, "name": room_display_name}))
                     groups_named.add(group_id)
                 print(f"    {room_display_name} -> {target_stream}")
+    snapcast.batch(group_calls)
 
     print("\n  Room assignment complete!")
 
@@ -327,36 +691,41 @@ def main():
     config = load_config()
     rooms = list(config.get("rooms", {}).keys())
 
-    # Step 1: Generate and install ALSA config
-    print("\n[1/7] Generating ALSA configuration...")
-    alsa_config = generate_alsa_config()
+    # Step 1: Generate ALSA + Snapcast configs and install ALSA config
+    print("\n[1/7] Generating configuration...")
+    alsa_config, snap_config = generate_configs()
     install_config(alsa_config, ASOUND_CONF)
 
-    # Step 2: Generate and install Snapcast config
-    print("\n[2/7] Generating Snapcast configuration...")
-    snap_config = generate_snapserver_config()
-    install_config(snap_config, SNAPSERVER_CONF)
+    # Step 2: Install Snapcast config
+    print("\n[2/7] Installing Snapcast configuration...")
+    snap_changed = install_config(snap_config, SNAPSERVER_CONF)
 
     # Step 3: Install service templates
     print("\n[3/7] Installing service templates...")
     install_service_templates()
 
-    # Step 4: Restart snapserver
-    print("\n[4/7] Restarting Snapcast server...")
-    restart_snapserver()
+    # One Snapcast connection for the rest of the deployment: opened by the
+    # readiness probe after the restart, reused for polling and group setup
+    with SnapcastClient() as snapcast:
+        # Step 4: Restart snapserver
+        print("\n[4/7] Restarting Snapcast server...")
+        if snap_changed:
+            restart_snapserver(snapcast)
+        else:
+            print("  Snapcast configuration unchanged, not restarting snapserver")
 
-    # Step 5: Restart room services (snapclient + sendspin)
-    print("\n[5/7] Restarting room services...")
-    restart_room_services(rooms)
+        # Step 5: Restart room services (snapclient + sendspin)
+        print("\n[5/7] Restarting room services...")
+        restart_room_services(rooms)
 
-    # Step 6: Wait for clients
-    print("\n[6/7] Waiting for Snapcast clients...")
-    expected_clients = [f"room_{room}" for room in rooms]
-    status = wait_for_clients(expected_clients, timeout=30)
+        # Step 6: Wait for clients
+        print("\n[6/7] Waiting for Snapcast clients...")
+        expected_clients = [f"room_{room}" for room in rooms]
+        status = wait_for_clients(snapcast, expected_clients, timeout=30)
 
-    # Step 7: Configure groups
-    print("\n[7/7] Configuring Snapcast groups...")
-    configure_snapcast_groups(config, status)
+        # Step 7: Configure groups
+        print("\n[7/7] Configuring Snapcast groups...")
+        configure_snapcast_groups(snapcast, config, status)
 
     print("\n" + "=" * 60)
     print("DEPLOYMENT COMPLETE")
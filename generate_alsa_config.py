@@ -11,11 +11,19 @@ Reads ../speaker_config.json (v2.0 format) and generates ALSA configuration with
 Note: Zones are handled by Snapcast, not ALSA.
 """
 
+import io
 import json
+import os
 import sys
-from pathlib import Path
 from collections import defaultdict
 
+# orjson parses noticeably faster; fall back to the stdlib parser without it
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
 # ALSA card name suffix pattern: GAB8, GAB8_1, GAB8_2, etc.
 def get_alsa_card_name(base_card: str, index: int) -> str:
     """Get ALSA card name for nth device of same type."""
@@ -23,78 +31,61 @@ def get_alsa_card_name(base_card: str, index: int) -> str:
         return base_card
     return f"{base_card}_{index}"
 
-CONFIG_FILE = Path(__file__).parent / "speaker_config.json"
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "speaker_config.json")
 
 # Default max volume coefficient (0.0-1.0)
 DEFAULT_MAX_VOLUME = 0.5
 
+# Shared read-only fallback for missing config sections (never mutated)
+_EMPTY = {}
+
 
 def load_config() -> dict:
     """Load speaker configuration from JSON."""
-    if not CONFIG_FILE.exists():
+    if not os.path.isfile(CONFIG_FILE):
         print(f"Error: {CONFIG_FILE} not found.", file=sys.stderr)
         print("Run speaker_identify.py first to create the configuration.", file=sys.stderr)
         sys.exit(1)
 
-    with open(CONFIG_FILE) as f:
-        config = json.load(f)
+    with open(CONFIG_FILE, "rb") as f:
+        config = _loads(f.read())
 
-    if config.get("version") != "2.0":
-        print("Error: Config file is not v2.0 format.", file=sys.stderr)
+    try:
+        check_config_version(config)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
         print("Run speaker_identify.py to upgrade the configuration.", file=sys.stderr)
         sys.exit(1)
 
     return config
 
 
-def get_max_volume(config: dict) -> float:
-    """Get max volume coefficient from global config."""
-    return config.get("global", {}).get("max_volume", DEFAULT_MAX_VOLUME)
-
-
-def generate_amplifier_config(config: dict) -> str:
-    """Generate base PCM definitions for all amplifiers."""
-    amplifiers = config.get("amplifiers", {})
-    max_vol = get_max_volume(config)
-    if not amplifiers:
-        return ""
-
-    # Group amps by card type to handle multiple devices of same type
-    card_counts = defaultdict(int)
-    amp_cards = {}
+def check_config_version(config: dict) -> None:
+    """Raise ValueError unless `config` is in the v2.0 format."""
+    if config.get("version") != "2.0":
+        raise ValueError("Config file is not v2.0 format.")
 
-    for amp_name in sorted(amplifiers.keys()):
-        amp = amplifiers[amp_name]
-        base_card = amp.get("card", "GAB8")
-        alsa_card = get_alsa_card_name(base_card, card_counts[base_card])
-        card_counts[base_card] += 1
-        amp_cards[amp_name] = alsa_card
 
-    output = """
-#########################################
-# AMPLIFIER DEFINITIONS
-#########################################
-"""
+def get_max_volume(config: dict) -> float:
+    """Get max volume coefficient from global config."""
+    return (config.get("global") or _EMPTY).get("max_volume", DEFAULT_MAX_VOLUME)
 
-    for amp_name in sorted(amplifiers.keys()):
-        amp = amplifiers[amp_name]
-        alsa_card = amp_cards[amp_name]
-        channels = amp.get("channels", 8)
 
-        output += f"""
-# {amp_name} - {alsa_card} ({channels} channels)
-pcm.{amp_name} {{
+# Per-amp hw + dmix PCMs, rendered with str.format by generate_amplifier_config
+_AMP_TMPL = """
+# {amp} - {card} ({channels} channels)
+pcm.{amp} {{
     type hw
-    card {alsa_card}
+    card {card}
     device 0
 }}
 
-pcm.{amp_name}_dmix {{
+pcm.{amp}_dmix {{
     type dmix
-    ipc_key 10{amp_name[-1] if amp_name[-1].isdigit() else '0'}
+    ipc_key 10{ipc_suffix}
     ipc_perm 0666
     slave {{
-        pcm "{amp_name}"
+        pcm "{amp}"
         channels {channels}
         rate 48000
         period_size 2048
@@ -102,35 +93,82 @@ pcm.{amp_name}_dmix {{
     }}
 }}
 """
-        # Generate per-channel devices for speaker identification (uses dmix for concurrent access)
-        for ch in range(1, channels + 1):
-            ch_idx = ch - 1  # 0-based for ALSA ttable
-            output += f"""
-pcm.{amp_name}_ch{ch}_raw {{
+
+# Per-channel identification PCMs (one pair per amp channel)
+_CHANNEL_TMPL = """
+pcm.{amp}_ch{ch}_raw {{
     type route
-    slave.pcm "{amp_name}_dmix"
+    slave.pcm "{amp}_dmix"
     slave.channels {channels}
-    ttable.0.{ch_idx} {max_vol}
-    ttable.1.{ch_idx} {max_vol}
+    ttable.0.{ch_idx} {vol}
+    ttable.1.{ch_idx} {vol}
 }}
 
-pcm.{amp_name}_ch{ch} {{
+pcm.{amp}_ch{ch} {{
     type plug
-    slave.pcm "{amp_name}_ch{ch}_raw"
+    slave.pcm "{amp}_ch{ch}_raw"
 }}
 """
 
-    return output, amp_cards
+
+def generate_amplifier_config(config: dict, max_vol: float) -> tuple[str, dict]:
+    """Generate base PCM definitions for all amplifiers."""
+    amplifiers = config.get("amplifiers", {})
+    if not amplifiers:
+        return "", {}
+
+    amp_names = sorted(amplifiers)
+
+    parts = ["""
+#########################################
+# AMPLIFIER DEFINITIONS
+#########################################
+"""]
+
+    # Group amps by card type to handle multiple devices of same type
+    card_counts = defaultdict(int)
+    amp_cards = {}
+
+    for amp_name in amp_names:
+        amp = amplifiers[amp_name]
+        base_card = amp.get("card", "GAB8")
+        alsa_card = get_alsa_card_name(base_card, card_counts[base_card])
+        card_counts[base_card] += 1
+        amp_cards[amp_name] = alsa_card
+        channels = amp.get("channels", 8)
+        last = amp_name[-1]
+        ipc_suffix = last if last.isdigit() else '0'
+
+        parts.append(_AMP_TMPL.format(
+            amp=amp_name,
+            card=alsa_card,
+            channels=channels,
+            ipc_suffix=ipc_suffix,
+        ))
+        # Generate per-channel devices for speaker identification (uses dmix for concurrent access)
+        for ch in range(1, channels + 1):
+            parts.append(_CHANNEL_TMPL.format(
+                amp=amp_name,
+                ch=ch,
+                ch_idx=ch - 1,  # 0-based for ALSA ttable
+                channels=channels,
+                vol=max_vol,
+            ))
+
+    return "".join(parts), amp_cards
 
 
-def get_speaker_info(config: dict, speaker_name: str, max_vol: float) -> dict:
-    """Get full speaker info including amplifier details."""
-    if not speaker_name or speaker_name not in config["speakers"]:
+def get_speaker_info(speakers: dict, amplifiers: dict, speaker_name: str, max_vol: float) -> dict:
+    """Get full speaker info including amplifier details.
+
+    speaker_name must be non-empty; callers skip unset room slots.
+    """
+    speaker = speakers.get(speaker_name)
+    if speaker is None:
         return None
 
-    speaker = config["speakers"][speaker_name]
     amp_name = speaker["amplifier"]
-    amp = config["amplifiers"].get(amp_name, {})
+    amp = amplifiers.get(amp_name, _EMPTY)
 
     # Calculate effective volume: speaker volume (0-100) * global max_volume
     speaker_vol = speaker.get("volume", 100) / 100.0
@@ -140,6 +178,7 @@ def get_speaker_info(config: dict, speaker_name: str, max_vol: float) -> dict:
         "amplifier": amp_name,
         "card": amp.get("card", ""),
         "channel": speaker["channel"],
+        "ch_idx": speaker["channel"] - 1,  # 0-based for ALSA ttable/bindings
         "volume": effective_vol
     }
 
@@ -152,9 +191,17 @@ def get_room_speakers(config: dict, max_vol: float) -> dict:
     it takes precedence and left/right are ignored.
     """
     rooms = {}
+    speakers = config["speakers"]
+    amplifiers = config["amplifiers"]
 
     for room_id, room_info in config["rooms"].items():
-        mono_info = get_speaker_info(config, room_info.get("mono"), max_vol)
+        m_name = room_info.get("mono")
+        l_name = room_info.get("left")
+        r_name = room_info.get("right")
+        if not (m_name or l_name or r_name):
+            continue
+
+        mono_info = get_speaker_info(speakers, amplifiers, m_name, max_vol) if m_name else None
         if mono_info:
             rooms[room_id] = {
                 "name": room_info.get("name", room_id),
@@ -165,8 +212,8 @@ def get_room_speakers(config: dict, max_vol: float) -> dict:
             }
             continue
 
-        left_info = get_speaker_info(config, room_info.get("left"), max_vol)
-        right_info = get_speaker_info(config, room_info.get("right"), max_vol)
+        left_info = get_speaker_info(speakers, amplifiers, l_name, max_vol) if l_name else None
+        right_info = get_speaker_info(speakers, amplifiers, r_name, max_vol) if r_name else None
         if left_info or right_info:
             rooms[room_id] = {
                 "name": room_info.get("name", room_id),
@@ -200,8 +247,8 @@ pcm.{name} {{
 def generate_same_device_config(room_id: str, left: dict, right: dict) -> str:
     """Generate ALSA config for stereo pair on same device — softvol per side."""
     device = left["amplifier"]
-    left_ch = left["channel"] - 1
-    right_ch = right["channel"] - 1
+    left_ch = left["ch_idx"]
+    right_ch = right["ch_idx"]
     left_ctrl = f"vol_{room_id}_left"
     right_ctrl = f"vol_{room_id}_right"
 
@@ -247,14 +294,14 @@ def generate_cross_device_config(room_id: str, left: dict, right: dict) -> str:
     """Cross-device stereo with per-side softvol on the respective amp's card."""
     left_device = left["amplifier"]
     right_device = right["amplifier"]
-    left_ch = left["channel"] - 1
-    right_ch = right["channel"] - 1
+    left_ch = left["ch_idx"]
+    right_ch = right["ch_idx"]
     left_ctrl = f"vol_{room_id}_left"
     right_ctrl = f"vol_{room_id}_right"
 
     return f"""
 #########
-# room_{room_id} - Cross-device stereo: {left_device} ch{left_ch+1} + {right_device} ch{right_ch+1}
+# room_{room_id} - Cross-device stereo: {left_device} ch{left["channel"]} + {right_device} ch{right["channel"]}
 #########
 
 pcm._internal_{room_id}_left_route {{
@@ -302,7 +349,7 @@ def generate_mono_config(room_id: str, speaker: dict, position: str) -> str:
     volume control above that.
     """
     device = speaker["amplifier"]
-    channel = speaker["channel"] - 1
+    channel = speaker["ch_idx"]
     ctrl = f"vol_{room_id}_{position}"
 
     return f"""
@@ -339,17 +386,17 @@ def generate_inputs_config(config: dict) -> str:
     if not inputs:
         return ""
 
-    output = """
+    parts = ["""
 #########################################
 # INPUT DEFINITIONS (USB capture → lox lineIn)
 #########################################
-"""
+"""]
     for input_id in sorted(inputs.keys()):
         inp = inputs[input_id]
         card = inp.get("card", input_id)
         channels = inp.get("channels", 2)
         rate = inp.get("sample_rate", 48000)
-        output += f"""
+        parts.append(f"""
 # input_{input_id} - capture from {card} ({channels}ch @ {rate}Hz native)
 pcm.input_{input_id} {{
     type plug
@@ -357,8 +404,8 @@ pcm.input_{input_id} {{
     slave.channels {channels}
     slave.rate {rate}
 }}
-"""
-    return output
+""")
+    return "".join(parts)
 
 
 def generate_all_rooms_config(rooms: dict) -> str:
@@ -366,41 +413,26 @@ def generate_all_rooms_config(rooms: dict) -> str:
     if not rooms:
         return ""
 
-    # Collect all unique devices and their channel mappings
+    # Collect all unique devices and their (channel, stereo_pos) mappings
     device_channels = defaultdict(list)
     for room_id, room in rooms.items():
         if room.get("mono"):
             # Mono rooms get both source channels into the single output.
-            device_channels[room["mono"]["amplifier"]].append({
-                "channel": room["mono"]["channel"] - 1,
-                "stereo_pos": 0,
-            })
-            device_channels[room["mono"]["amplifier"]].append({
-                "channel": room["mono"]["channel"] - 1,
-                "stereo_pos": 1,
-            })
+            mono_ch = room["mono"]["ch_idx"]
+            device_channels[room["mono"]["amplifier"]].extend(((mono_ch, 0), (mono_ch, 1)))
             continue
         if room.get("left"):
-            device_channels[room["left"]["amplifier"]].append({
-                "channel": room["left"]["channel"] - 1,
-                "stereo_pos": 0
-            })
+            device_channels[room["left"]["amplifier"]].append((room["left"]["ch_idx"], 0))
         if room.get("right"):
-            device_channels[room["right"]["amplifier"]].append({
-                "channel": room["right"]["channel"] - 1,
-                "stereo_pos": 1
-            })
+            device_channels[room["right"]["amplifier"]].append((room["right"]["ch_idx"], 1))
 
     if len(device_channels) == 1:
         # All on one device - use route with dmix
         device = list(device_channels.keys())[0]
         channels = device_channels[device]
 
-        ttable_lines = []
-        for ch_info in channels:
-            ttable_lines.append(f"    ttable.{ch_info['stereo_pos']}.{ch_info['channel']} 1")
-
-        ttable = "\n".join(sorted(set(ttable_lines)))
+        ttable_set = {f"    ttable.{pos}.{ch} 1" for ch, pos in channels}
+        ttable = "\n".join(sorted(ttable_set))
 
         return f"""
 #########
@@ -430,9 +462,9 @@ pcm.all_rooms {{
             slaves.append(f'    slaves.{slave_letter}.pcm "{device}_dmix"')
             slaves.append(f'    slaves.{slave_letter}.channels 8')
 
-            for ch_info in channels:
+            for ch, _pos in channels:
                 bindings.append(f'    bindings.{binding_idx}.slave {slave_letter}')
-                bindings.append(f'    bindings.{binding_idx}.channel {ch_info["channel"]}')
+                bindings.append(f'    bindings.{binding_idx}.channel {ch}')
                 binding_idx += 1
 
         slaves_str = "\n".join(slaves)
@@ -456,84 +488,109 @@ pcm.all_rooms {{
 """
 
 
-def main():
-    print("=" * 50, file=sys.stderr)
-    print("ALSA CONFIGURATION GENERATOR", file=sys.stderr)
-    print("=" * 50, file=sys.stderr)
+def write_alsa_config(config: dict, out, log=sys.stderr) -> list:
+    """Write complete asound.conf content to a text stream, section by section.
 
-    config = load_config()
+    Progress lines go to `log`. Returns the sorted room ids.
+    Raises ValueError if no room has any speaker.
+    """
     max_vol = get_max_volume(config)
     rooms = get_room_speakers(config, max_vol)
 
     if not rooms:
-        print("No rooms configured!", file=sys.stderr)
-        sys.exit(1)
+        raise ValueError("No rooms configured!")
 
     amplifiers = config.get("amplifiers", {})
-    print(f"\nGenerating config for {len(amplifiers)} amplifier(s) and {len(rooms)} room(s)...", file=sys.stderr)
-    print(f"Global max volume: {max_vol} ({max_vol*100:.0f}%)\n", file=sys.stderr)
+    print(f"\nGenerating config for {len(amplifiers)} amplifier(s) and {len(rooms)} room(s)...", file=log)
+    print(f"Global max volume: {max_vol} ({max_vol*100:.0f}%)\n", file=log)
 
-    # Generate header
-    output = """
+    out.write("""
 #########################################
 # AUTO-GENERATED WONDOM SPEAKER CONFIG
 # Generated by generate_alsa_config.py
 #########################################
-"""
+""")
 
     # Generate amplifier definitions
-    amp_config, amp_cards = generate_amplifier_config(config)
-    output += amp_config
+    amp_config, amp_cards = generate_amplifier_config(config, max_vol)
+    out.write(amp_config)
     for amp_name, alsa_card in amp_cards.items():
-        print(f"  {amp_name}: hw:{alsa_card}", file=sys.stderr)
+        print(f"  {amp_name}: hw:{alsa_card}", file=log)
 
-    output += """
+    out.write("""
 #########################################
 # ROOM DEFINITIONS
 #########################################
-"""
+""")
 
     # Generate config for each room
-    for room_id in sorted(rooms.keys()):
+    room_ids = sorted(rooms)
+    for room_id in room_ids:
         room = rooms[room_id]
         mono = room.get("mono")
         left = room.get("left")
         right = room.get("right")
 
         if mono:
-            output += generate_mono_config(room_id, mono, "mono")
-            print(f"  room_{room_id}: mono on {mono['amplifier']}_ch{mono['channel']} vol={mono['volume']:.0%}", file=sys.stderr)
+            out.write(generate_mono_config(room_id, mono, "mono"))
+            print(f"  room_{room_id}: mono on {mono['amplifier']}_ch{mono['channel']} vol={mono['volume']:.0%}", file=log)
         elif left and right:
             if left["amplifier"] == right["amplifier"]:
                 # Same device - use route plugin
-                output += generate_same_device_config(room_id, left, right)
-                print(f"  room_{room_id}: stereo on {left['amplifier']} (ch{left['channel']}, ch{right['channel']}) vol={left['volume']:.0%}/{right['volume']:.0%}", file=sys.stderr)
+                out.write(generate_same_device_config(room_id, left, right))
+                print(f"  room_{room_id}: stereo on {left['amplifier']} (ch{left['channel']}, ch{right['channel']}) vol={left['volume']:.0%}/{right['volume']:.0%}", file=log)
             else:
                 # Different devices - use multi plugin
-                output += generate_cross_device_config(room_id, left, right)
-                print(f"  room_{room_id}: cross-device ({left['amplifier']}_ch{left['channel']} + {right['amplifier']}_ch{right['channel']}) vol={left['volume']:.0%}/{right['volume']:.0%}", file=sys.stderr)
+                out.write(generate_cross_device_config(room_id, left, right))
+                print(f"  room_{room_id}: cross-device ({left['amplifier']}_ch{left['channel']} + {right['amplifier']}_ch{right['channel']}) vol={left['volume']:.0%}/{right['volume']:.0%}", file=log)
         elif left:
-            output += generate_mono_config(room_id, left, "left")
-            print(f"  room_{room_id}: mono (left only on {left['amplifier']}_ch{left['channel']}) vol={left['volume']:.0%}", file=sys.stderr)
+            out.write(generate_mono_config(room_id, left, "left"))
+            print(f"  room_{room_id}: mono (left only on {left['amplifier']}_ch{left['channel']}) vol={left['volume']:.0%}", file=log)
         elif right:
-            output += generate_mono_config(room_id, right, "right")
-            print(f"  room_{room_id}: mono (right only on {right['amplifier']}_ch{right['channel']}) vol={right['volume']:.0%}", file=sys.stderr)
+            out.write(generate_mono_config(room_id, right, "right"))
+            print(f"  room_{room_id}: mono (right only on {right['amplifier']}_ch{right['channel']}) vol={right['volume']:.0%}", file=log)
 
     # Generate all_rooms combined output
-    output += generate_all_rooms_config(rooms)
-    print(f"  all_rooms: combined output to all speakers", file=sys.stderr)
+    out.write(generate_all_rooms_config(rooms))
+    print(f"  all_rooms: combined output to all speakers", file=log)
 
     # Generate input (capture) definitions
     inputs = config.get("inputs", {})
     if inputs:
-        output += generate_inputs_config(config)
+        out.write(generate_inputs_config(config))
         for input_id in sorted(inputs.keys()):
             inp = inputs[input_id]
             print(f"  input_{input_id}: capture from {inp.get('card', input_id)} "
-                  f"→ lox '{inp.get('lox_input_id', input_id)}'", file=sys.stderr)
+                  f"→ lox '{inp.get('lox_input_id', input_id)}'", file=log)
+
+    out.write("\n")
+    return room_ids
+
 
-    # Print to stdout
-    print(output)
+def generate_alsa_config(config: dict, log=sys.stderr) -> str:
+    """Generate complete asound.conf content."""
+    buf = io.StringIO()
+    write_alsa_config(config, buf, log)
+    return buf.getvalue()
+
+
+def main():
+    # Progress goes to stderr in many small prints; buffer them and flush once
+    # at the end (any exit path flushes too) instead of writing line by line
+    sys.stderr.reconfigure(line_buffering=False, write_through=False)
+
+    print("=" * 50, file=sys.stderr)
+    print("ALSA CONFIGURATION GENERATOR", file=sys.stderr)
+    print("=" * 50, file=sys.stderr)
+
+    config = load_config()
+    try:
+        # Stream each section to stdout as it is generated
+        room_ids = write_alsa_config(config, sys.stdout)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    sys.stdout.flush()
 
     print("\n" + "=" * 50, file=sys.stderr)
     print("USAGE:", file=sys.stderr)
@@ -542,11 +599,12 @@ def main():
     print("\n  Or save to file:", file=sys.stderr)
     print("    python3 generate_alsa_config.py > wondom_rooms.conf", file=sys.stderr)
     print("\n  Test with:", file=sys.stderr)
-    for room_id in sorted(rooms.keys()):
+    for room_id in room_ids:
         print(f"    aplay -D room_{room_id} test.wav", file=sys.stderr)
     print(f"    aplay -D all_rooms test.wav", file=sys.stderr)
     print("\n  Note: Zones are managed by Snapcast, not ALSA.", file=sys.stderr)
     print("=" * 50, file=sys.stderr)
+    sys.stderr.flush()
 
 
 if __name__ == "__main__":
@@ -7,23 +7,39 @@ Reads ../speaker_config.json (v2.0 format) and generates snapserver.conf with:
 - Configured for the defined Spotify and AirPlay instances
 """
 
+import io
 import json
+import os
 import sys
 import urllib.parse
-from pathlib import Path
+from collections import Counter, defaultdict
+from functools import lru_cache
 
-CONFIG_FILE = Path(__file__).parent / "speaker_config.json"
+# orjson parses noticeably faster; fall back to the stdlib parser without it
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "speaker_config.json")
+
+
+@lru_cache(maxsize=256)
+def _quote(value: str) -> str:
+    """URL-encode a source URI value (memoized: names recur across streams)."""
+    return urllib.parse.quote(value, safe='')
 
 
 def load_config() -> dict:
     """Load speaker configuration from JSON."""
-    if not CONFIG_FILE.exists():
+    if not os.path.isfile(CONFIG_FILE):
         print(f"Error: {CONFIG_FILE} not found.", file=sys.stderr)
         print("Run speaker_identify.py first to create the configuration.", file=sys.stderr)
         sys.exit(1)
 
-    with open(CONFIG_FILE) as f:
-        config = json.load(f)
+    with open(CONFIG_FILE, "rb") as f:
+        config = _loads(f.read())
 
     if config.get("version") != "2.0":
         print("Error: Config file is not v2.0 format.", file=sys.stderr)
@@ -33,11 +49,98 @@ def load_config() -> dict:
     return config
 
 
+def _pipe_source(stream_id: str, stream_config: dict, config: dict, name: str, encoded_stream_name: str) -> str:
+    path = stream_config.get("path", f"/tmp/snapfifo_{stream_id}")
+    sampleformat = stream_config.get("sampleformat", "48000:16:2")
+    codec = stream_config.get("codec", "flac")
+    return f"source = pipe://{path}?name={encoded_stream_name}&sampleformat={sampleformat}&codec={codec}"
+
+
+def _librespot_source(stream_id: str, stream_config: dict, config: dict, name: str, encoded_stream_name: str) -> str:
+    bitrate = stream_config.get("bitrate", 320)
+    device_name = stream_config.get("name", stream_id)
+    initial_volume = stream_config.get("initial_volume", 50)
+    # Cache directory for storing Spotify credentials after first login
+    cache_dir = stream_config.get("cache", f"/var/cache/snapserver/librespot-{stream_id}")
+    # librespot streams use the meta stream type in newer snapcast versions
+    # but the librespot source type for direct integration
+    # Use 320kbps for best quality, 44100 Hz (Spotify's native format)
+    return f"source = librespot:///librespot?name={encoded_stream_name}&devicename={device_name}&bitrate=320&cache={cache_dir}&volume={initial_volume}&sampleformat=44100:16:2"
+
+
+def _airplay_source(stream_id: str, stream_config: dict, config: dict, name: str, encoded_stream_name: str) -> str:
+    device_name = stream_config.get("name", stream_id)
+    # AirPlay 2 uses port 7000+ (classic AirPlay uses 5000)
+    port = stream_config.get("port", 7000)
+    shairport_path = stream_config.get("shairport_path", "/usr/local/bin/shairport-sync")
+    # Each AirPlay 2 instance needs a unique device ID offset
+    device_id_offset = stream_config.get("device_id_offset", 0)
+    config_file = stream_config.get("config_file", "")
+
+    if config_file:
+        # Use process source with explicit config file for unique device IDs
+        params = f"-c {config_file} -o stdout -a \"{device_name}\" -p {port}"
+        encoded_params = _quote(params)
+        return f"source = process://{shairport_path}?name={encoded_stream_name}&params={encoded_params}"
+    else:
+        # Fallback to native airplay source (single instance only)
+        return f"source = airplay://{shairport_path}?name={encoded_stream_name}&devicename={device_name}&port={port}&coverart=false"
+
+
+def _process_source(stream_id: str, stream_config: dict, config: dict, name: str, encoded_stream_name: str) -> str:
+    path = stream_config.get("path", "")
+    params = stream_config.get("params", "")
+    return f"source = process://{path}?name={encoded_stream_name}&params={params}"
+
+
+def _tcp_source(stream_id: str, stream_config: dict, config: dict, name: str, encoded_stream_name: str) -> str:
+    host = stream_config.get("host", "0.0.0.0")
+    port = stream_config.get("port", 4953)
+    mode = stream_config.get("mode", "server")
+    return f"source = tcp://{host}:{port}?name={encoded_stream_name}&mode={mode}"
+
+
+def _alsa_source(stream_id: str, stream_config: dict, config: dict, name: str, encoded_stream_name: str) -> str:
+    # Look up input from inputs section if specified
+    input_id = stream_config.get("input")
+    if input_id:
+        inputs = config.get("inputs", {})
+        input_config = inputs.get(input_id, {})
+        device = f"hw:{input_config.get('card', input_id)}"
+        # Use input's display name if stream doesn't have one
+        if name == stream_id:
+            name = input_config.get("name", stream_id)
+            encoded_stream_name = _quote(name)
+        # Use sampleformat from input config, then stream config, then default
+        sampleformat = stream_config.get("sampleformat", input_config.get("sampleformat", "48000:16:2"))
+    else:
+        device = stream_config.get("device", "default")
+        sampleformat = stream_config.get("sampleformat", "48000:16:2")
+    # ALSA source format: alsa://?device=<dev>&name=<name>&sampleformat=<fmt>
+    return f"source = alsa://?name={encoded_stream_name}&device={device}&sampleformat={sampleformat}"
+
+
+# Source line builders by stream type
+_HANDLERS = {
+    "pipe": _pipe_source,
+    "librespot": _librespot_source,
+    "airplay": _airplay_source,
+    "process": _process_source,
+    "tcp": _tcp_source,
+    "alsa": _alsa_source,
+}
+
+
 def generate_stream_source(stream_id: str, stream_config: dict, config: dict) -> str:
     """Generate a source line for snapserver.conf."""
     stream_type = stream_config.get("type", "pipe")
     name = stream_config.get("name", stream_id)
 
+    handler = _HANDLERS.get(stream_type)
+    if handler is None:
+        print(f"Warning: Unknown stream type '{stream_type}' for {stream_id}", file=sys.stderr)
+        return f"# Unknown type: {stream_type} for {stream_id}"
+
     # Generate a user-friendly display name for Snapcast based on stream type
     # This appears in Snapcast clients/web UI
     if stream_type == "librespot":
@@ -50,84 +153,15 @@ def generate_stream_source(stream_id: str, stream_config: dict, config: dict) ->
         stream_name = name if name != stream_id else stream_id
 
     # URL-encode the stream name for use in source URI
-    encoded_stream_name = urllib.parse.quote(stream_name, safe='')
+    return handler(stream_id, stream_config, config, name, _quote(stream_name))
 
-    if stream_type == "pipe":
-        path = stream_config.get("path", f"/tmp/snapfifo_{stream_id}")
-        sampleformat = stream_config.get("sampleformat", "48000:16:2")
-        codec = stream_config.get("codec", "flac")
-        return f"source = pipe://{path}?name={encoded_stream_name}&sampleformat={sampleformat}&codec={codec}"
-
-    elif stream_type == "librespot":
-        bitrate = stream_config.get("bitrate", 320)
-        device_name = stream_config.get("name", stream_id)
-        initial_volume = stream_config.get("initial_volume", 50)
-        # Cache directory for storing Spotify credentials after first login
-        cache_dir = stream_config.get("cache", f"/var/cache/snapserver/librespot-{stream_id}")
-        # librespot streams use the meta stream type in newer snapcast versions
-        # but the librespot source type for direct integration
-        # Use 320kbps for best quality, 44100 Hz (Spotify's native format)
-        return f"source = librespot:///librespot?name={encoded_stream_name}&devicename={device_name}&bitrate=320&cache={cache_dir}&volume={initial_volume}&sampleformat=44100:16:2"
 
-    elif stream_type == "airplay":
-        device_name = stream_config.get("name", stream_id)
-        # AirPlay 2 uses port 7000+ (classic AirPlay uses 5000)
-        port = stream_config.get("port", 7000)
-        shairport_path = stream_config.get("shairport_path", "/usr/local/bin/shairport-sync")
-        # Each AirPlay 2 instance needs a unique device ID offset
-        device_id_offset = stream_config.get("device_id_offset", 0)
-        config_file = stream_config.get("config_file", "")
-
-        if config_file:
-            # Use process source with explicit config file for unique device IDs
-            params = f"-c {config_file} -o stdout -a \"{device_name}\" -p {port}"
-            encoded_params = urllib.parse.quote(params, safe='')
-            return f"source = process://{shairport_path}?name={encoded_stream_name}&params={encoded_params}"
-        else:
-            # Fallback to native airplay source (single instance only)
-            return f"source = airplay://{shairport_path}?name={encoded_stream_name}&devicename={device_name}&port={port}&coverart=false"
-
-    elif stream_type == "process":
-        path = stream_config.get("path", "")
-        params = stream_config.get("params", "")
-        return f"source = process://{path}?name={encoded_stream_name}&params={params}"
-
-    elif stream_type == "tcp":
-        host = stream_config.get("host", "0.0.0.0")
-        port = stream_config.get("port", 4953)
-        mode = stream_config.get("mode", "server")
-        return f"source = tcp://{host}:{port}?name={encoded_stream_name}&mode={mode}"
-
-    elif stream_type == "alsa":
-        # Look up input from inputs section if specified
-        input_id = stream_config.get("input")
-        if input_id:
-            inputs = config.get("inputs", {})
-            input_config = inputs.get(input_id, {})
-            device = f"hw:{input_config.get('card', input_id)}"
-            # Use input's display name if stream doesn't have one
-            if name == stream_id:
-                name = input_config.get("name", stream_id)
-                encoded_stream_name = urllib.parse.quote(name, safe='')
-            # Use sampleformat from input config, then stream config, then default
-            sampleformat = stream_config.get("sampleformat", input_config.get("sampleformat", "48000:16:2"))
-        else:
-            device = stream_config.get("device", "default")
-            sampleformat = stream_config.get("sampleformat", "48000:16:2")
-        # ALSA source format: alsa://?device=<dev>&name=<name>&sampleformat=<fmt>
-        return f"source = alsa://?name={encoded_stream_name}&device={device}&sampleformat={sampleformat}"
-
-    else:
-        print(f"Warning: Unknown stream type '{stream_type}' for {stream_id}", file=sys.stderr)
-        return f"# Unknown type: {stream_type} for {stream_id}"
-
-
-def generate_snapserver_conf(config: dict) -> str:
-    """Generate complete snapserver.conf content."""
+def write_snapserver_conf(config: dict, out) -> None:
+    """Write complete snapserver.conf content to a text stream, section by section."""
     snapcast = config.get("snapcast", {})
     streams = snapcast.get("streams", {})
 
-    output = """###############################################################################
+    out.write("""###############################################################################
 #     ______                                                                  #
 #    / _____)                                                                 #
 #   ( (____   ____   _____  ____    ___  _____   ____  _   _  _____   ____    #
@@ -177,16 +211,21 @@ chunk_ms = 26
 # Send audio to muted clients
 send_to_muted = false
 
-"""
+""")
 
     # Generate source lines for each stream
-    output += "# Stream sources\n"
+    out.write("# Stream sources\n")
     for stream_id in sorted(streams.keys()):
         stream_config = streams[stream_id]
         source_line = generate_stream_source(stream_id, stream_config, config)
-        output += f"{source_line}\n"
+        out.write(f"{source_line}\n")
 
-    return output
+
+def generate_snapserver_conf(config: dict) -> str:
+    """Generate complete snapserver.conf content."""
+    buf = io.StringIO()
+    write_snapserver_conf(config, buf)
+    return buf.getvalue()
 
 
 def print_stream_targets(config: dict):
@@ -201,6 +240,13 @@ def print_stream_targets(config: dict):
     print("=" * 50, file=sys.stderr)
     print("\nUse these mappings to configure Snapcast groups via JSON-RPC:\n", file=sys.stderr)
 
+    # Index rooms by zone once instead of rescanning them per stream and zone
+    zone_to_rooms = defaultdict(set)
+    for room_id, room_info in rooms.items():
+        for zone_id in room_info.get("zones", ()):
+            zone_to_rooms[zone_id].add(room_id)
+    all_room_ids = set(rooms)
+
     for stream_id, targets in sorted(stream_targets.items()):
         target_zones = targets.get("zones", [])
         target_rooms = targets.get("rooms", [])
@@ -210,12 +256,9 @@ def print_stream_targets(config: dict):
         for zone_id in target_zones:
             zone_info = zones.get(zone_id, {})
             if zone_info.get("include_all"):
-                resolved_rooms = set(rooms.keys())
+                resolved_rooms = set(all_room_ids)
                 break
-            # Find rooms in this zone
-            for room_id, room_info in rooms.items():
-                if zone_id in room_info.get("zones", []):
-                    resolved_rooms.add(room_id)
+            resolved_rooms.update(zone_to_rooms.get(zone_id, ()))
 
         print(f"  {stream_id}:", file=sys.stderr)
         if target_zones:
@@ -224,6 +267,10 @@ def print_stream_targets(config: dict):
 
 
 def main():
+    # Progress goes to stderr in many small prints; buffer them and flush once
+    # at the end (any exit path flushes too) instead of writing line by line
+    sys.stderr.reconfigure(line_buffering=False, write_through=False)
+
     print("=" * 50, file=sys.stderr)
     print("SNAPSERVER CONFIGURATION GENERATOR", file=sys.stderr)
     print("=" * 50, file=sys.stderr)
@@ -239,16 +286,14 @@ def main():
     print(f"\nGenerating config for {len(streams)} stream(s)...\n", file=sys.stderr)
 
     # Count stream types
-    type_counts = {}
+    type_counts = Counter(sc.get("type", "pipe") for sc in streams.values())
     for stream_id, stream_config in streams.items():
-        stream_type = stream_config.get("type", "pipe")
-        type_counts[stream_type] = type_counts.get(stream_type, 0) + 1
         stream_name = stream_config.get("name", stream_id)
-        print(f"  {stream_id}: {stream_type} ({stream_name})", file=sys.stderr)
+        print(f"  {stream_id}: {stream_config.get('type', 'pipe')} ({stream_name})", file=sys.stderr)
 
     # Generate and print config
-    output = generate_snapserver_conf(config)
-    print(output)
+    write_snapserver_conf(config, sys.stdout)
+    sys.stdout.write("\n")
 
     # Print stream targets
     print_stream_targets(config)
@@ -262,6 +307,7 @@ def main():
     print("\n  Restart snapserver:", file=sys.stderr)
     print("    sudo systemctl restart snapserver", file=sys.stderr)
     print("=" * 50, file=sys.stderr)
+    sys.stderr.flush()
 
 
 if __name__ == "__main__":
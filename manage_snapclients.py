@@ -8,11 +8,21 @@ Manages systemd snapclient services for all rooms defined in speaker_config.json
 import json
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# pystemd talks to systemd over D-Bus directly; without it, shell out to systemctl
+try:
+    from pystemd.dbuslib import DBus
+    from pystemd.systemd1 import Unit
+except ImportError:
+    DBus = None
+
 CONFIG_FILE = Path(__file__).parent.parent / "speaker_config.json"
 SERVICE_TEMPLATE = "snapclient@.service"
 SERVICE_INSTALL_PATH = Path("/etc/systemd/system")
+# Commands that run sudo systemctl (everything except status)
+PRIVILEGED_COMMANDS = {"install", "enable", "start", "stop", "restart", "disable", "setup"}
 
 
 def load_config() -> dict:
@@ -56,78 +66,114 @@ def install_service():
     print("Service template installed.")
 
 
+def get_room_services(config: dict) -> list[str]:
+    """Get snapclient unit names for all rooms."""
+    return [f"snapclient@{device}.service" for device in get_room_devices(config)]
+
+
+def systemctl_all(verb: str, services: list[str], check: bool = True, options: tuple = ()) -> bool:
+    """Apply a systemctl verb to all units in a single invocation.
+
+    If the batched call fails, each unit is retried on its own (concurrently)
+    so the failing ones can be reported individually.
+    """
+    if not services:
+        return True
+    if not check:
+        return run_cmd(["sudo", "systemctl", verb, *options, *services], check=False)
+
+    result = subprocess.run(["sudo", "systemctl", verb, *options, *services], capture_output=True, text=True)
+    if result.returncode == 0:
+        return True
+
+    # Units that already came back up must not be bounced a second time
+    retry_verb = "start" if verb == "restart" else verb
+    with ThreadPoolExecutor(max_workers=min(16, len(services))) as pool:
+        results = list(pool.map(
+            lambda service: subprocess.run(["sudo", "systemctl", retry_verb, *options, service], capture_output=True, text=True),
+            services,
+        ))
+
+    failed = [(service, r) for service, r in zip(services, results) if r.returncode != 0]
+    for service, r in failed:
+        print(f"  Error: {service}: {r.stderr.strip()}", file=sys.stderr)
+    return not failed
+
+
 def enable_all(config: dict):
     """Enable snapclient services for all rooms."""
-    devices = get_room_devices(config)
-    print(f"\nEnabling {len(devices)} snapclient services...")
+    services = get_room_services(config)
+    print(f"\nEnabling {len(services)} snapclient services...", end=" ")
+    if systemctl_all("enable", services):
+        print("OK")
+
 
-    for device in devices:
-        service = f"snapclient@{device}.service"
-        print(f"  Enabling {service}...", end=" ")
-        if run_cmd(["sudo", "systemctl", "enable", service]):
-            print("OK")
+def enable_now_all(config: dict):
+    """Enable and start snapclient services for all rooms (enable --now)."""
+    services = get_room_services(config)
+    print(f"\nEnabling and starting {len(services)} snapclient services...", end=" ")
+    if systemctl_all("enable", services, options=("--now",)):
+        print("OK")
 
 
 def start_all(config: dict):
     """Start snapclient services for all rooms."""
-    devices = get_room_devices(config)
-    print(f"\nStarting {len(devices)} snapclient services...")
-
-    for device in devices:
-        service = f"snapclient@{device}.service"
-        print(f"  Starting {service}...", end=" ")
-        if run_cmd(["sudo", "systemctl", "start", service]):
-            print("OK")
+    services = get_room_services(config)
+    print(f"\nStarting {len(services)} snapclient services...", end=" ")
+    if systemctl_all("start", services):
+        print("OK")
 
 
 def stop_all(config: dict):
     """Stop snapclient services for all rooms."""
-    devices = get_room_devices(config)
-    print(f"\nStopping {len(devices)} snapclient services...")
-
-    for device in devices:
-        service = f"snapclient@{device}.service"
-        print(f"  Stopping {service}...", end=" ")
-        if run_cmd(["sudo", "systemctl", "stop", service], check=False):
-            print("OK")
+    services = get_room_services(config)
+    print(f"\nStopping {len(services)} snapclient services...", end=" ")
+    if systemctl_all("stop", services, check=False):
+        print("OK")
 
 
 def disable_all(config: dict):
     """Disable snapclient services for all rooms."""
-    devices = get_room_devices(config)
-    print(f"\nDisabling {len(devices)} snapclient services...")
-
-    for device in devices:
-        service = f"snapclient@{device}.service"
-        print(f"  Disabling {service}...", end=" ")
-        if run_cmd(["sudo", "systemctl", "disable", service], check=False):
-            print("OK")
+    services = get_room_services(config)
+    print(f"\nDisabling {len(services)} snapclient services...", end=" ")
+    if systemctl_all("disable", services, check=False):
+        print("OK")
 
 
 def restart_all(config: dict):
     """Restart snapclient services for all rooms."""
-    devices = get_room_devices(config)
-    print(f"\nRestarting {len(devices)} snapclient services...")
-
-    for device in devices:
-        service = f"snapclient@{device}.service"
-        print(f"  Restarting {service}...", end=" ")
-        if run_cmd(["sudo", "systemctl", "restart", service]):
-            print("OK")
+    services = get_room_services(config)
+    print(f"\nRestarting {len(services)} snapclient services...", end=" ")
+    if systemctl_all("restart", services):
+        print("OK")
+
+
+def get_active_states(services: list[str]) -> list[str]:
+    """Get the ActiveState of each unit, in order."""
+    if DBus is not None:
+        # One bus connection for all units, no fork/exec
+        with DBus() as bus:
+            return [
+                Unit(service.encode(), bus=bus, _autoload=True).Unit.ActiveState.decode()
+                for service in services
+            ]
+
+    # is-active prints one state per unit, in argument order
+    result = subprocess.run(
+        ["systemctl", "is-active", *services],
+        capture_output=True, text=True
+    )
+    return result.stdout.splitlines()
 
 
 def status_all(config: dict):
     """Show status of all snapclient services."""
-    devices = get_room_devices(config)
-    print(f"\nStatus of {len(devices)} snapclient services:\n")
-
-    for device in devices:
-        service = f"snapclient@{device}.service"
-        result = subprocess.run(
-            ["systemctl", "is-active", service],
-            capture_output=True, text=True
-        )
-        status = result.stdout.strip()
+    services = get_room_services(config)
+    print(f"\nStatus of {len(services)} snapclient services:\n")
+    if not services:
+        return
+
+    for service, status in zip(services, get_active_states(services)):
         symbol = "●" if status == "active" else "○"
         print(f"  {symbol} {service}: {status}")
 
@@ -163,6 +209,13 @@ def main():
     command = sys.argv[1].lower()
     config = load_config()
 
+    # Validate sudo credentials once up front so the systemctl calls that
+    # follow hit the cached timestamp instead of each going through PAM
+    if command in PRIVILEGED_COMMANDS:
+        if subprocess.run(["sudo", "-v"]).returncode != 0:
+            print("Error: sudo authentication failed.", file=sys.stderr)
+            sys.exit(1)
+
     if command == "install":
         install_service()
     elif command == "enable":
@@ -179,8 +232,7 @@ def main():
         status_all(config)
     elif command == "setup":
         install_service()
-        enable_all(config)
-        start_all(config)
+        enable_now_all(config)
         print("\nSetup complete!")
         status_all(config)
     else:
@@ -7,77 +7,144 @@ Saves the mapping to ../speaker_config.json for use with generate_alsa_config.py
 """
 
 import argparse
+import copy
+import hashlib
+import io
 import json
 import subprocess
 import re
 import os
+import select
+import string
 import sys
 import tempfile
 import threading
 import struct
+import wave
 import math
+from functools import lru_cache
 from pathlib import Path
 
+# pyalsaaudio writes to the PCM directly; without it, pipe through aplay
+try:
+    import alsaaudio
+except ImportError:
+    alsaaudio = None
+
+# orjson serializes noticeably faster; fall back to the stdlib encoder without it
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode()
+
 CONFIG_FILE = Path(__file__).parent / "speaker_config.json"
 
 # Pattern for amplifier card names (amp1, amp2, etc.)
 # These are set via udev rules in /etc/udev/rules.d/99-wondom-gab8.rules
 AMP_PATTERN = re.compile(r'^amp(\d+)$')
 
+ASOUND_CARDS = Path("/proc/asound/cards")
 
-def discover_devices():
-    """Discover available amplifier devices (amp1, amp2, etc.)."""
+# Card lines in /proc/asound/cards and `aplay -l` output: (number, id)
+PROC_CARD_LINE = re.compile(r'\s*(\d+)\s+\[(\S+)\s*\]:')
+APLAY_CARD_LINE = re.compile(r'^card (\d+): (\S+) \[')
+
+
+def list_sound_cards() -> list:
+    """List (card number, card id) pairs.
+
+    Reads the kernel's card list directly; `aplay -l` is only used if
+    /proc/asound/cards is missing.
+    """
     try:
-        result = subprocess.run(
+        text = ASOUND_CARDS.read_text()
+        # Example line: " 2 [amp1           ]: USB-Audio - WONDOM GAB8"
+        pattern = PROC_CARD_LINE
+    except FileNotFoundError:
+        text = subprocess.run(
             ["aplay", "-l"], capture_output=True, text=True, check=True
-        )
-        available = {}
-        # Parse output to find card numbers for amp devices
+        ).stdout
         # Example line: "card 2: amp1 [WONDOM GAB8], device 0: USB Audio [USB Audio]"
-        for line in result.stdout.split('\n'):
-            match = re.match(r'^card (\d+): (\S+) \[', line)
-            if match:
-                card_num = match.group(1)
-                card_name = match.group(2)
-                if AMP_PATTERN.match(card_name):
-                    available[card_name] = {
-                        "card": card_name,
-                        "hw": f"hw:{card_num}",
-                        "channels": 8
-                    }
-                    print(f"  Found {card_name} at hw:{card_num}")
-        return available
+        pattern = APLAY_CARD_LINE
+
+    return [match.groups() for match in map(pattern.match, text.splitlines()) if match]
+
+
+def discover_devices():
+    """Discover available amplifier devices (amp1, amp2, etc.)."""
+    try:
+        cards = list_sound_cards()
     except subprocess.CalledProcessError as e:
         print(f"Error discovering devices: {e}")
         return {}
 
+    available = {}
+    for card_num, card_name in cards:
+        if AMP_PATTERN.match(card_name) and card_name not in available:
+            available[card_name] = {
+                "card": card_name,
+                "hw": f"hw:{card_num}",
+                "channels": 8
+            }
+            print(f"  Found {card_name} at hw:{card_num}")
+    return available
+
 
-def generate_tts_wav(text: str, amplitude: int = 200) -> str:
-    """Generate a WAV file with German TTS and return the path."""
-    fd, path = tempfile.mkstemp(suffix='.wav')
-    os.close(fd)
+def _scratch_fd() -> int:
+    """Anonymous in-memory file for a child process to write into."""
+    if hasattr(os, "memfd_create"):
+        return os.memfd_create("snappy_tts")
+    # No memfd support: an unlinked temp file (O_TMPFILE) works too
+    with tempfile.TemporaryFile() as f:
+        return os.dup(f.fileno())
 
+
+@lru_cache(maxsize=None)
+def _synthesize_tts(text: str, amplitude: int) -> bytes:
+    """Run espeak-ng and return the WAV bytes; raises on failure.
+
+    Memoized: each announcement is synthesized once. Failures raise, so
+    lru_cache doesn't keep them and the next call retries. espeak-ng writes
+    into an anonymous memfd (via its /proc/self/fd path), so nothing touches
+    the filesystem and there is nothing to clean up.
+    """
+    fd = _scratch_fd()
     try:
         subprocess.run(
-            ["espeak-ng", "-v", "de", "-a", str(amplitude), "-w", path, text],
+            ["espeak-ng", "-v", "de", "-a", str(amplitude), "-w", f"/proc/self/fd/{fd}", text],
             check=True,
-            capture_output=True
+            capture_output=True,
+            pass_fds=(fd,),
         )
-        return path
+        os.lseek(fd, 0, os.SEEK_SET)
+        with os.fdopen(os.dup(fd), "rb") as f:
+            return f.read()
+    finally:
+        os.close(fd)
+
+
+def generate_tts_wav(text: str, amplitude: int = 200) -> bytes:
+    """Generate German TTS and return the WAV bytes, or None on failure."""
+    try:
+        return _synthesize_tts(text, amplitude)
     except subprocess.CalledProcessError as e:
         print(f"  TTS error: {e}")
-        os.unlink(path)
         return None
     except FileNotFoundError:
         print("  espeak-ng not found. Install with: sudo apt install espeak-ng")
-        os.unlink(path)
         return None
 
 
-def generate_beep_wav(frequency: int = 880, duration: float = 0.15, volume: float = 0.3) -> str:
-    """Generate a short sine wave beep WAV file. No external dependencies."""
-    fd, path = tempfile.mkstemp(suffix='.wav')
-    os.close(fd)
+@lru_cache(maxsize=None)
+def generate_beep_wav(frequency: int = 880, duration: float = 0.15, volume: float = 0.3) -> bytes:
+    """Generate a short sine wave beep and return the WAV bytes. No external dependencies.
+
+    Memoized like _synthesize_tts.
+    """
 
     sample_rate = 48000
     num_samples = int(sample_rate * duration)
@@ -100,7 +167,7 @@ def generate_beep_wav(frequency: int = 880, duration: float = 0.15, volume: floa
         samples.append(int(sample * 32767))
 
     # Write WAV file manually (no wave module needed for simple case)
-    with open(path, 'wb') as f:
+    with io.BytesIO() as f:
         num_channels = 1
         bits_per_sample = 16
         byte_rate = sample_rate * num_channels * bits_per_sample // 8
@@ -128,56 +195,45 @@ def generate_beep_wav(frequency: int = 880, duration: float = 0.15, volume: floa
         for sample in samples:
             f.write(struct.pack('<h', sample))
 
-    return path
+        return f.getvalue()
 
 
-def play_tts_on_channel(device_name: str, channel: int, text: str) -> bool:
-    """Play TTS audio on a specific channel using per-channel ALSA device."""
-    wav_path = generate_tts_wav(text)
-    if not wav_path:
-        return False
+# aplay -f names for WAV sample widths (bytes)
+APLAY_FORMATS = {1: "U8", 2: "S16_LE", 3: "S24_3LE", 4: "S32_LE"}
 
-    try:
-        # Use per-channel ALSA device (e.g., amp1_ch3)
-        alsa_device = f"{device_name}_ch{channel}"
-        subprocess.run(
-            ["aplay", "-D", alsa_device, wav_path],
-            check=True,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            timeout=10
-        )
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"  Playback error on {alsa_device}: {e}")
-        return False
-    except subprocess.TimeoutExpired:
-        return True
-    finally:
-        os.unlink(wav_path)
 
+def wait_process(proc: subprocess.Popen, timeout: float):
+    """Wait up to `timeout` seconds for proc to exit; return its exit code or None.
 
-def play_beep_on_channel(device_name: str, channel: int) -> bool:
-    """Play a short beep on a specific channel using per-channel ALSA device."""
-    wav_path = generate_beep_wav()
+    Blocks in poll() on a pidfd where the kernel supports it (Linux 5.3+)
+    rather than Popen.wait()'s sleep/waitpid polling loop.
+    """
+    fd = None
+    if hasattr(os, "pidfd_open"):
+        try:
+            fd = os.pidfd_open(proc.pid)
+        except OSError:
+            pass  # Old kernel, or already reaped; Popen.wait() handles both
+    if fd is not None:
+        try:
+            poller = select.poll()
+            poller.register(fd, select.POLLIN)
+            poller.poll(int(timeout * 1000))
+        finally:
+            os.close(fd)
+        timeout = 0
 
     try:
-        alsa_device = f"{device_name}_ch{channel}"
-        subprocess.run(
-            ["aplay", "-D", alsa_device, wav_path],
-            check=True,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            timeout=10
-        )
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"  Playback error on {alsa_device}: {e}")
-        return False
+        return proc.wait(timeout=timeout)
     except subprocess.TimeoutExpired:
-        return True
-    finally:
-        os.unlink(wav_path)
+        return None
+
+
+def read_wav(wav_data: bytes) -> tuple:
+    """Parse WAV bytes, returning (frames, channels, sample_width, rate)."""
+    with wave.open(io.BytesIO(wav_data), "rb") as w:
+        frames = w.readframes(w.getnframes())
+        return frames, w.getnchannels(), w.getsampwidth(), w.getframerate()
 
 
 class RepeatingAnnouncement:
@@ -191,32 +247,168 @@ class RepeatingAnnouncement:
         self.interval = interval if not sleep_mode else 2.0  # Shorter interval for beeps
         self.sleep_mode = sleep_mode
         self._stop_event = threading.Event()
+        # Self-pipe so stop() can wake the playback loop out of poll(). Closed
+        # by whichever finishes last, stop() or the playback thread; the lock
+        # keeps stop() from writing to an fd the thread already closed.
+        self._stop_r = self._stop_w = None
+        self._pipe_lock = threading.Lock()
         self._thread = None
 
-    def _loop(self):
-        """Loop that plays announcement repeatedly."""
+    def _feed(self, write, period: bytes, slice_size: int):
+        """Write the period repeatedly, one slice at a time, until stopped."""
         while not self._stop_event.is_set():
-            if self.sleep_mode:
-                play_beep_on_channel(self.device_name, self.channel)
-            else:
-                play_tts_on_channel(self.device_name, self.channel, self.text)
-            # Wait for interval or until stopped
-            self._stop_event.wait(self.interval)
+            for offset in range(0, len(period), slice_size):
+                if self._stop_event.is_set():
+                    return
+                write(period[offset:offset + slice_size])
+
+    def _loop(self):
+        try:
+            self._play()
+        finally:
+            self._close_stop_pipe()
+
+    def _play(self):
+        """Loop that plays announcement repeatedly.
+
+        The PCM stays open for the whole announcement: the clip, padded with
+        silence to `interval` seconds, is written over and over in 100ms
+        slices, via pyalsaaudio if available, else through a single aplay
+        process fed over stdin (see _pipe_to).
+        """
+        # Render the clip once; every repetition replays the same samples
+        wav_data = generate_beep_wav() if self.sleep_mode else generate_tts_wav(self.text)
+        if not wav_data:
+            return
+
+        frames, channels, width, rate = read_wav(wav_data)
+        frame_bytes = channels * width
+        period_frames = rate // 10  # 100ms of audio
+        slice_size = period_frames * frame_bytes
+        # Pad with silence so repetitions start every `interval` seconds
+        # (or back to back if the clip is longer than that)
+        period = frames + bytes(max(0, int(rate * self.interval) * frame_bytes - len(frames)))
+        # Pad to whole slices so every write is exactly one ALSA period
+        period += bytes(-len(period) % slice_size)
+
+        # Use per-channel ALSA device (e.g., amp1_ch3)
+        alsa_device = f"{self.device_name}_ch{self.channel}"
+        if alsaaudio is not None:
+            try:
+                pcm = alsaaudio.PCM(
+                    alsaaudio.PCM_PLAYBACK,
+                    device=alsa_device,
+                    channels=channels,
+                    rate=rate,
+                    format=getattr(alsaaudio, f"PCM_FORMAT_{APLAY_FORMATS[width]}"),
+                    periodsize=period_frames,
+                )
+            except alsaaudio.ALSAAudioError as e:
+                print(f"  Playback error on {alsa_device}: {e}")
+                return
+            try:
+                self._feed(pcm.write, period, slice_size)
+            finally:
+                pcm.close()
+            return
+
+        proc = subprocess.Popen(
+            ["aplay", "-q", "-D", alsa_device, "-t", "raw",
+             "-f", APLAY_FORMATS[width], "-c", str(channels), "-r", str(rate)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            if not self._pipe_to(proc, period, slice_size):
+                print(f"  Playback error on {alsa_device}: aplay exited with {wait_process(proc, 2)}")
+        finally:
+            proc.terminate()
+            if wait_process(proc, 2) is None:
+                proc.kill()
+                proc.wait()
+            proc.stdin.close()
+
+    def _pipe_to(self, proc: subprocess.Popen, period: bytes, slice_size: int) -> bool:
+        """Stream the period into aplay's stdin until stop() or aplay exits.
+
+        Event-driven: poll() waits on the stop pipe, stdin writability and
+        (where supported) a pidfd for aplay, so stop() interrupts playback
+        immediately instead of after the current write drains. Returns False
+        if aplay went away on its own.
+        """
+        stdin_fd = proc.stdin.fileno()
+        os.set_blocking(stdin_fd, False)
+        poller = select.poll()
+        poller.register(self._stop_r, select.POLLIN)
+        poller.register(stdin_fd, select.POLLOUT)
+        pidfd = None
+        if hasattr(os, "pidfd_open"):
+            try:
+                pidfd = os.pidfd_open(proc.pid)
+                poller.register(pidfd, select.POLLIN)
+            except OSError:
+                pidfd = None
+
+        view = memoryview(period)
+        offset = 0
+        try:
+            while True:
+                events = dict(poller.poll())
+                if self._stop_r in events:
+                    return True
+                if pidfd in events or events.get(stdin_fd, 0) & (select.POLLERR | select.POLLHUP):
+                    return False
+                try:
+                    written = os.write(stdin_fd, view[offset:offset + slice_size])
+                except BlockingIOError:
+                    continue
+                except BrokenPipeError:
+                    return False
+                offset = (offset + written) % len(period)
+        finally:
+            if pidfd is not None:
+                os.close(pidfd)
 
     def start(self):
         """Start playing the announcement repeatedly."""
         self._stop_event.clear()
+        self._stop_r, self._stop_w = os.pipe()
         self._thread = threading.Thread(target=self._loop, daemon=True)
         self._thread.start()
 
+    def _close_stop_pipe(self):
+        with self._pipe_lock:
+            if self._stop_r is not None:
+                os.close(self._stop_r)
+                os.close(self._stop_w)
+                self._stop_r = self._stop_w = None
+
     def stop(self):
         """Stop the repeating announcement."""
         self._stop_event.set()
+        with self._pipe_lock:
+            if self._stop_w is not None:
+                os.write(self._stop_w, b"x")
         if self._thread:
             self._thread.join(timeout=2)
+            if self._thread.is_alive():
+                return  # Still shutting down aplay; the thread closes the pipe
+        self._close_stop_pipe()
+
+
+# ASCII characters not allowed in room/zone ids
+_NAME_DROP = str.maketrans("", "", "".join(
+    c for c in map(chr, range(128)) if c not in string.ascii_lowercase + string.digits + "_"
+))
 
 
-def get_room_name(existing_rooms: list) -> str:
+def normalize_name(name: str) -> str:
+    """Turn whitespace runs into "_" and drop anything outside [a-z0-9_]."""
+    return "_".join(name.split()).encode("ascii", "ignore").decode("ascii").translate(_NAME_DROP)
+
+
+def get_room_name(existing_rooms: set) -> str:
     """Prompt user for room name with suggestions."""
     if existing_rooms:
         print(f"  Existing rooms: {', '.join(sorted(existing_rooms))}")
@@ -230,8 +422,7 @@ def get_room_name(existing_rooms: list) -> str:
             return "skip"
 
         # Normalize room name: replace spaces with underscores
-        room = re.sub(r'\s+', '_', room)
-        room = re.sub(r'[^a-z0-9_]', '', room)
+        room = normalize_name(room)
 
         if not room:
             print("  Invalid room name. Use letters, numbers, and underscores.")
@@ -251,7 +442,7 @@ def get_position() -> str:
         print("  Please enter 'l' or 'r'.")
 
 
-def get_zones(existing_zones: list, room_name: str) -> list:
+def get_zones(existing_zones: set, room_name: str) -> list:
     """Prompt user for zone assignments."""
     if existing_zones:
         print(f"  Available zones: {', '.join(sorted(existing_zones))}")
@@ -264,7 +455,7 @@ def get_zones(existing_zones: list, room_name: str) -> list:
 
         zones = [z.strip() for z in zones_input.split(',') if z.strip()]
         # Normalize zone names
-        zones = [re.sub(r'[^a-z0-9_]', '', re.sub(r'\s+', '_', z)) for z in zones]
+        zones = [normalize_name(z) for z in zones]
         zones = [z for z in zones if z]  # Remove empty strings
 
         return zones
@@ -362,26 +553,76 @@ def migrate_old_config(old_config: dict) -> dict:
     return new_config
 
 
+# Digest of the config content last written (or found on disk)
+_saved_digest = None
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
 def save_config(config: dict, quiet: bool = False):
-    """Save configuration to JSON file."""
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(config, f, indent=2)
+    """Save configuration to JSON file (atomically, via a temp file).
+
+    Skips the write entirely if the serialized content is unchanged.
+    """
+    global _saved_digest
+    data = _dumps(config)
+    digest = _digest(data)
+    if _saved_digest is None and CONFIG_FILE.exists():
+        _saved_digest = _digest(CONFIG_FILE.read_bytes())
+
+    if digest != _saved_digest:
+        # Unique temp name: the web UI may be saving the same file meanwhile.
+        # fsync before the rename so a crash can't leave it half-written.
+        fd, tmp_path = tempfile.mkstemp(
+            dir=CONFIG_FILE.parent, prefix=".speaker_config.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                # mkstemp creates the file 0600; keep the config's own mode
+                try:
+                    os.fchmod(f.fileno(), CONFIG_FILE.stat().st_mode & 0o777)
+                except FileNotFoundError:
+                    os.fchmod(f.fileno(), 0o644)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, CONFIG_FILE)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        _saved_digest = digest
     if not quiet:
         print(f"\nConfiguration saved to {CONFIG_FILE}")
 
 
-def find_speaker_for_channel(config: dict, device_name: str, channel: int) -> tuple:
-    """Find existing speaker and room for a device/channel combo."""
+def build_channel_index(config: dict) -> dict:
+    """Map (amplifier, channel) -> (speaker, room, position).
+
+    Rebuild after changing config["speakers"] or config["rooms"].
+    """
+    speaker_rooms = {}
+    for room_id, room_info in config["rooms"].items():
+        for pos in ("left", "right"):
+            speaker_name = room_info.get(pos)
+            if speaker_name:
+                speaker_rooms.setdefault(speaker_name, (room_id, pos))
+
+    index = {}
     for speaker_name, info in config["speakers"].items():
-        if info["amplifier"] == device_name and info["channel"] == channel:
-            # Find which room it belongs to
-            for room_id, room_info in config["rooms"].items():
-                if room_info.get("left") == speaker_name:
-                    return speaker_name, room_id, "left"
-                if room_info.get("right") == speaker_name:
-                    return speaker_name, room_id, "right"
-            return speaker_name, None, None
-    return None, None, None
+        index.setdefault(
+            (info["amplifier"], info["channel"]),
+            (speaker_name, *speaker_rooms.get(speaker_name, (None, None))),
+        )
+    return index
+
+
+def find_speaker_for_channel(config: dict, device_name: str, channel: int, index: dict = None) -> tuple:
+    """Find existing speaker and room for a device/channel combo."""
+    if index is None:
+        index = build_channel_index(config)
+    return index.get((device_name, channel), (None, None, None))
 
 
 def print_summary(config: dict):
@@ -482,128 +723,149 @@ def main():
 
     quit_requested = False
     channel_num = 0
+    dirty = False
+    # Config as it was before an unfinished remap removed the old mapping
+    pre_remap = None
+    channel_index = build_channel_index(config)
 
-    for device_name in sorted(devices.keys()):
-        device_info = devices[device_name]
-
-        for channel in range(1, device_info["channels"] + 1):
-            channel_num += 1
-
-            # Check if already configured
-            existing_speaker, existing_room, existing_pos = find_speaker_for_channel(
-                config, device_name, channel
-            )
-
-            print("-" * 40)
-            print(f"Channel {channel_num}/{total_channels}: {device_name} channel {channel}")
-
-            # Skip already-mapped channels unless --all is specified
-            if existing_speaker and existing_room and not args.all:
-                print(f"  Already mapped to: {existing_room} ({existing_pos}) - skipping")
-                continue
-
-            # Build TTS announcement text in German
-            amp_num = device_name.replace("amp", "")
-            if existing_speaker and existing_room:
-                print(f"  Currently mapped to: {existing_room} ({existing_pos})")
-                # Announce room/position and amp/channel
-                pos_de = "links" if existing_pos == "left" else "rechts"
-                room_name = existing_room.replace('_', ' ')
-                tts_text = f"{room_name} {pos_de}, Verstarker {amp_num}, Kanal {channel}"
-            else:
-                # No existing mapping - announce device and channel only
-                tts_text = f"Verstarker {amp_num}, Kanal {channel}"
+    try:
+        for device_name, device_info in sorted(devices.items()):
 
-            if args.sleep:
-                print(f"  Playing beep (repeats every 2 seconds)...")
-            else:
-                print(f"  Playing announcement: \"{tts_text}\" (repeats every 4 seconds)...")
+            for channel in range(1, device_info["channels"] + 1):
+                channel_num += 1
+                pre_remap = None
 
-            # Start repeating announcement/beep in background
-            announcement = RepeatingAnnouncement(
-                device_name, channel, tts_text, sleep_mode=args.sleep
-            )
-            announcement.start()
+                # Check if already configured
+                existing_speaker, existing_room, existing_pos = find_speaker_for_channel(
+                    config, device_name, channel, channel_index
+                )
 
-            try:
-                # For existing mappings, ask if user wants to remap
-                if existing_speaker:
-                    response = input("  Remap? [y/N]: ").strip().lower()
-                    if response != "y":
-                        print("  Keeping existing mapping.")
-                        continue
-                    # Remove old mapping
-                    if existing_speaker in config["speakers"]:
-                        del config["speakers"][existing_speaker]
-                    if existing_room and existing_room in config["rooms"]:
-                        config["rooms"][existing_room][existing_pos] = None
-                        # Clean up empty rooms
-                        room_info = config["rooms"][existing_room]
-                        if not room_info.get("left") and not room_info.get("right"):
-                            del config["rooms"][existing_room]
-                            existing_rooms.discard(existing_room)
-
-                # Get room name while announcement repeats
-                room = get_room_name(list(existing_rooms))
-
-                if room == "quit":
-                    quit_requested = True
-                    break
-                if room == "skip":
-                    print("  Skipped.")
+                print("-" * 40)
+                print(f"Channel {channel_num}/{total_channels}: {device_name} channel {channel}")
+
+                # Skip already-mapped channels unless --all is specified
+                if existing_speaker and existing_room and not args.all:
+                    print(f"  Already mapped to: {existing_room} ({existing_pos}) - skipping")
                     continue
 
-                # Get position while announcement still repeats
-                position = get_position()
+                # Build TTS announcement text in German
+                amp_num = device_name.replace("amp", "")
+                if existing_speaker and existing_room:
+                    print(f"  Currently mapped to: {existing_room} ({existing_pos})")
+                    # Announce room/position and amp/channel
+                    pos_de = "links" if existing_pos == "left" else "rechts"
+                    room_name = existing_room.replace('_', ' ')
+                    tts_text = f"{room_name} {pos_de}, Verstarker {amp_num}, Kanal {channel}"
+                else:
+                    # No existing mapping - announce device and channel only
+                    tts_text = f"Verstarker {amp_num}, Kanal {channel}"
+
+                if args.sleep:
+                    print(f"  Playing beep (repeats every 2 seconds)...")
+                else:
+                    print(f"  Playing announcement: \"{tts_text}\" (repeats every 4 seconds)...")
+
+                # Start repeating announcement/beep in background
+                announcement = RepeatingAnnouncement(
+                    device_name, channel, tts_text, sleep_mode=args.sleep
+                )
+                announcement.start()
+
+                try:
+                    # For existing mappings, ask if user wants to remap
+                    if existing_speaker:
+                        response = input("  Remap? [y/N]: ").strip().lower()
+                        if response != "y":
+                            print("  Keeping existing mapping.")
+                            continue
+                        # Remove old mapping
+                        pre_remap = copy.deepcopy(config)
+                        if existing_speaker in config["speakers"]:
+                            del config["speakers"][existing_speaker]
+                        if existing_room and existing_room in config["rooms"]:
+                            config["rooms"][existing_room][existing_pos] = None
+                            # Clean up empty rooms
+                            room_info = config["rooms"][existing_room]
+                            if not room_info.get("left") and not room_info.get("right"):
+                                del config["rooms"][existing_room]
+                                existing_rooms.discard(existing_room)
+                        channel_index = build_channel_index(config)
+
+                    # Get room name while announcement repeats
+                    room = get_room_name(existing_rooms)
+
+                    if room == "quit":
+                        quit_requested = True
+                        break
+                    if room == "skip":
+                        print("  Skipped.")
+                        continue
 
-            finally:
-                announcement.stop()
+                    # Get position while announcement still repeats
+                    position = get_position()
 
-            # Create speaker entry
-            speaker_name = f"{room}_{position}"
+                finally:
+                    announcement.stop()
 
-            # Check for conflicts
-            if speaker_name in config["speakers"]:
-                old = config["speakers"][speaker_name]
-                print(f"  Warning: {speaker_name} already mapped to {old['amplifier']} ch{old['channel']}")
-                response = input("  Replace? [y/N]: ").strip().lower()
-                if response != "y":
-                    continue
+                # Create speaker entry
+                speaker_name = f"{room}_{position}"
 
-            # Add speaker
-            config["speakers"][speaker_name] = {
-                "amplifier": device_name,
-                "channel": channel,
-                "volume": 100,
-                "latency": 0
-            }
+                # Check for conflicts
+                if speaker_name in config["speakers"]:
+                    old = config["speakers"][speaker_name]
+                    print(f"  Warning: {speaker_name} already mapped to {old['amplifier']} ch{old['channel']}")
+                    response = input("  Replace? [y/N]: ").strip().lower()
+                    if response != "y":
+                        continue
 
-            # Add/update room
-            if room not in config["rooms"]:
-                # New room - ask for zones
-                zones = get_zones(list(existing_zones), room)
-                # Add any new zones
-                for z in zones:
-                    if z not in config["zones"]:
-                        config["zones"][z] = {"name": z.replace("_", " ").title()}
-                        existing_zones.add(z)
-
-                config["rooms"][room] = {
-                    "name": room.replace("_", " ").title(),
-                    "left": None,
-                    "right": None,
-                    "zones": zones
+                # Add speaker
+                config["speakers"][speaker_name] = {
+                    "amplifier": device_name,
+                    "channel": channel,
+                    "volume": 100,
+                    "latency": 0
                 }
-                existing_rooms.add(room)
 
-            config["rooms"][room][position] = speaker_name
-            print(f"  Mapped: {speaker_name} -> {device_name} ch{channel}")
-
-            # Save immediately after each mapping so progress is never lost
+                # Add/update room
+                if room not in config["rooms"]:
+                    # New room - ask for zones
+                    zones = get_zones(existing_zones, room)
+                    # Add any new zones
+                    for z in zones:
+                        if z not in config["zones"]:
+                            config["zones"][z] = {"name": z.replace("_", " ").title()}
+                            existing_zones.add(z)
+
+                    config["rooms"][room] = {
+                        "name": room.replace("_", " ").title(),
+                        "left": None,
+                        "right": None,
+                        "zones": zones
+                    }
+                    existing_rooms.add(room)
+
+                config["rooms"][room][position] = speaker_name
+                print(f"  Mapped: {speaker_name} -> {device_name} ch{channel}")
+
+                dirty = True
+                pre_remap = None
+                channel_index = build_channel_index(config)
+
+            # Save after each device so progress is never lost
+            if dirty:
+                save_config(config, quiet=True)
+                dirty = False
+
+            if quit_requested:
+                break
+    except BaseException:
+        # Interrupted (Ctrl-C): keep mappings made on the current device, but
+        # never a remap that removed the old mapping and got no new one
+        if pre_remap is not None:
+            save_config(pre_remap, quiet=True)
+        elif dirty:
             save_config(config, quiet=True)
-
-        if quit_requested:
-            break
+        raise
 
     # Save and show summary
     save_config(config)
@@ -1,12 +1,16 @@
 #!/usr/bin/env python3
 """Multiroom Audio Web Interface - FastAPI Application"""
 
+import os
 from pathlib import Path
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
 from routers import pages, api
+from services.config import ConfigService
+from services.audio import AudioService
 
 # Paths
 BASE_DIR = Path(__file__).parent
@@ -15,19 +19,35 @@ TEMPLATES_DIR = BASE_DIR / "templates"
 PROJECT_DIR = BASE_DIR.parent
 CONFIG_FILE = PROJECT_DIR / "speaker_config.json"
 
+# API responses are always compact JSON; with orjson installed, encode them
+# with it (skips FastAPI's json.dumps pass on every status poll).
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+except ImportError:
+    DefaultResponse = JSONResponse
+
 # App setup
-app = FastAPI(title="Multiroom Audio", version="1.0.0")
+app = FastAPI(title="Multiroom Audio", version="1.0.0", default_response_class=DefaultResponse)
 
-# Static files
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+# Static files. Behind a reverse proxy that serves webui/static itself (see
+# README), set WEBUI_STATIC_VIA_PROXY=1 so assets never reach Python.
+if os.environ.get("WEBUI_STATIC_VIA_PROXY") != "1":
+    app.mount("/static", StaticFiles(directory=STATIC_DIR, check_dir=False), name="static")
 
-# Templates
+# Templates: compile them all now rather than on each one's first request.
+# Templates only change on deploy, which restarts the service anyway.
 templates = Jinja2Templates(directory=TEMPLATES_DIR)
+templates.env.auto_reload = False
+for template_path in TEMPLATES_DIR.glob("*.html"):
+    templates.env.get_template(template_path.name)
 
-# Share templates and config path with routers
+# Share templates, config path and long-lived services with routers
 app.state.templates = templates
 app.state.config_file = CONFIG_FILE
 app.state.project_dir = PROJECT_DIR
+app.state.config_service = ConfigService(CONFIG_FILE, autosave=False)
+app.state.audio_service = AudioService(PROJECT_DIR)
 
 # Include routers
 app.include_router(pages.router)
@@ -36,4 +56,7 @@ app.include_router(api.router, prefix="/api")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8080)
+    # uvloop + httptools come with uvicorn[standard]; pin them so a missing
+    # extra fails loudly instead of silently falling back to pure asyncio/h11.
+    # One worker: config writes and apply runs assume a single process.
+    uvicorn.run(app, host="0.0.0.0", port=8080, loop="uvloop", http="httptools", access_log=False)
@@ -1,39 +1,47 @@
 """API routes - REST endpoints"""
 
+import asyncio
 import copy
+import time
+from typing import Annotated
 
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Depends, Request, HTTPException
 from pydantic import BaseModel
 
 from services.config import ConfigService
 from services.audio import AudioService
-from services.apply import apply_config, apply_inputs, amixer_set, linear_to_amixer_pct
+from services.apply import (
+    apply_config, apply_inputs, amixer_set, linear_to_amixer_pct, systemctl_is_active,
+)
 from services.audio_cards import detect_cards, annotate_configured_amps, find_card_for_amp
 
 router = APIRouter(tags=["api"])
 
 
 def get_config_service(request: Request) -> ConfigService:
-    return ConfigService(request.app.state.config_file)
+    return request.app.state.config_service
 
 
 def get_audio_service(request: Request) -> AudioService:
-    return AudioService(request.app.state.project_dir)
+    return request.app.state.audio_service
+
+
+# App-wide singletons (see app.py), injected per endpoint
+ConfigDep = Annotated[ConfigService, Depends(get_config_service)]
+AudioDep = Annotated[AudioService, Depends(get_audio_service)]
 
 
 # === Config endpoints ===
 
 @router.get("/config")
-async def get_config(request: Request):
+async def get_config(request: Request, config_svc: ConfigDep):
     """Get full configuration"""
-    config_svc = get_config_service(request)
     return config_svc.config
 
 
 @router.get("/config/rooms")
-async def get_rooms(request: Request):
+async def get_rooms(request: Request, config_svc: ConfigDep):
     """Get all rooms"""
-    config_svc = get_config_service(request)
     return config_svc.get_rooms()
 
 
@@ -47,38 +55,37 @@ class RoomUpdate(BaseModel):
 
 
 @router.post("/config/rooms/{room_id}")
-async def create_room(request: Request, room_id: str, data: RoomUpdate):
+async def create_room(request: Request, room_id: str, data: RoomUpdate, config_svc: ConfigDep):
     """Create a new room"""
-    config_svc = get_config_service(request)
     config_svc.create_room(room_id, data.model_dump())
+    await config_svc.asave()
     return {"status": "ok", "room_id": room_id}
 
 
 @router.put("/config/rooms/{room_id}")
-async def update_room(request: Request, room_id: str, data: RoomUpdate):
+async def update_room(request: Request, room_id: str, data: RoomUpdate, config_svc: ConfigDep):
     """Update a room"""
-    config_svc = get_config_service(request)
     if not config_svc.get_room(room_id):
         raise HTTPException(status_code=404, detail="Room not found")
     config_svc.update_room(room_id, data.model_dump())
+    await config_svc.asave()
     return {"status": "ok", "room_id": room_id}
 
 
 @router.delete("/config/rooms/{room_id}")
-async def delete_room(request: Request, room_id: str):
+async def delete_room(request: Request, room_id: str, config_svc: ConfigDep):
     """Delete a room"""
-    config_svc = get_config_service(request)
     if not config_svc.delete_room(room_id):
         raise HTTPException(status_code=404, detail="Room not found")
+    await config_svc.asave()
     return {"status": "ok"}
 
 
 # === Speaker endpoints ===
 
 @router.get("/config/speakers")
-async def get_speakers(request: Request):
+async def get_speakers(request: Request, config_svc: ConfigDep):
     """Get all speakers"""
-    config_svc = get_config_service(request)
     return config_svc.get_speakers()
 
 
@@ -90,24 +97,23 @@ class SpeakerUpdate(BaseModel):
 
 
 @router.put("/config/speakers/{speaker_id}")
-async def update_speaker(request: Request, speaker_id: str, data: SpeakerUpdate):
+async def update_speaker(request: Request, speaker_id: str, data: SpeakerUpdate, config_svc: ConfigDep):
     """Update a speaker"""
-    config_svc = get_config_service(request)
     config_svc.update_speaker(speaker_id, data.model_dump())
+    await config_svc.asave()
     return {"status": "ok", "speaker_id": speaker_id}
 
 
 # === Amp discovery / management ===
 
 @router.get("/system/audio-cards")
-async def audio_cards(request: Request):
+async def audio_cards(request: Request, config_svc: ConfigDep):
     """List all ALSA cards on the system.
 
     Each entry indicates whether it's already configured as an amp and whether
     it looks like a USB audio device that could be added.
     """
-    config_svc = get_config_service(request)
-    cards = detect_cards()
+    cards = await asyncio.to_thread(detect_cards)
     annotated = annotate_configured_amps(cards, config_svc.get_amplifiers())
     return {"cards": annotated}
 
@@ -119,14 +125,13 @@ class AmpAdd(BaseModel):
 
 
 @router.post("/config/amps/{amp_id}")
-async def add_amp(request: Request, amp_id: str, data: AmpAdd):
+async def add_amp(request: Request, amp_id: str, data: AmpAdd, config_svc: ConfigDep):
     """Register a new amplifier in the config.
 
     Does NOT write a udev rule — that's a system-level concern. If you want
     persistent ALSA naming for a freshly plugged-in amp, also add the matching
     rule to devconfig/99-wondom-gab8.rules and reload udev.
     """
-    config_svc = get_config_service(request)
     if amp_id in config_svc.get_amplifiers():
         raise HTTPException(status_code=409, detail=f"Amp {amp_id!r} already exists")
     if not amp_id.replace("_", "").isalnum():
@@ -138,6 +143,7 @@ async def add_amp(request: Request, amp_id: str, data: AmpAdd):
     if data.gpio is not None:
         entry["gpio"] = int(data.gpio)
     config_svc.add_amplifier(amp_id, entry)
+    await config_svc.asave()
     return {"status": "ok", "amp_id": amp_id}
 
 
@@ -148,26 +154,25 @@ class AmpUpdate(BaseModel):
 
 
 @router.patch("/config/amps/{amp_id}")
-async def update_amp(request: Request, amp_id: str, data: AmpUpdate):
+async def update_amp(request: Request, amp_id: str, data: AmpUpdate, config_svc: ConfigDep):
     """Update an existing amplifier's settings (currently: GPIO pin).
 
     Pass `gpio: null` (or omit) to clear the GPIO mapping — the amp is then
     treated as always-on (status: on; on/off no-op; powermanager skips it).
     """
-    config_svc = get_config_service(request)
     partial = data.model_dump(exclude_unset=True)
     # Map omitted-but-meaningful semantics: if the client posted gpio:null
     # explicitly, model_dump includes it; if they POSTed an empty body we
     # don't touch anything.
     if not config_svc.update_amplifier(amp_id, partial):
         raise HTTPException(status_code=404, detail="Amp not found")
+    await config_svc.asave()
     return {"status": "ok", "amp_id": amp_id, "applied": partial}
 
 
 @router.delete("/config/amps/{amp_id}")
-async def delete_amp(request: Request, amp_id: str):
+async def delete_amp(request: Request, amp_id: str, config_svc: ConfigDep):
     """Remove an amplifier. Refuses if any speaker still references it."""
-    config_svc = get_config_service(request)
     used_by = [s for s, sp in config_svc.get_speakers().items() if sp.get("amplifier") == amp_id]
     if used_by:
         raise HTTPException(
@@ -176,6 +181,7 @@ async def delete_amp(request: Request, amp_id: str):
         )
     if not config_svc.delete_amplifier(amp_id):
         raise HTTPException(status_code=404, detail="Amp not found")
+    await config_svc.asave()
     return {"status": "ok"}
 
 
@@ -217,11 +223,10 @@ def _input_with_status(input_id: str, inp: dict, cards: list) -> dict:
 
 
 @router.get("/config/inputs")
-async def list_inputs(request: Request):
+async def list_inputs(request: Request, config_svc: ConfigDep):
     """List configured inputs, each annotated with whether its capture card is
     currently present and how many capture channels it advertises."""
-    config_svc = get_config_service(request)
-    cards = detect_cards()
+    cards = await asyncio.to_thread(detect_cards)
     return {
         "inputs": {
             iid: _input_with_status(iid, inp, cards)
@@ -231,13 +236,12 @@ async def list_inputs(request: Request):
 
 
 @router.post("/config/inputs/{input_id}")
-async def add_input(request: Request, input_id: str, data: InputAdd):
+async def add_input(request: Request, input_id: str, data: InputAdd, config_svc: ConfigDep):
     """Register a new audio input and apply (regenerate ALSA + start bridge).
 
     Like amps, this does NOT write a udev rule — for persistent ALSA naming of
     the capture card, add a matching rule to devconfig/ and reload udev.
     """
-    config_svc = get_config_service(request)
     project_dir = request.app.state.project_dir
 
     if input_id in config_svc.get_inputs():
@@ -255,20 +259,20 @@ async def add_input(request: Request, input_id: str, data: InputAdd):
         "autostart": bool(data.autostart),
     }
     config_svc.add_input(input_id, entry)
+    await config_svc.asave()
     new_config = copy.deepcopy(config_svc.config)
 
     try:
         result = await apply_inputs(project_dir, old_config, new_config)
     except RuntimeError as e:
-        config_svc.save(old_config)  # roll back on apply failure
+        await config_svc.asave(old_config)  # roll back on apply failure
         raise HTTPException(status_code=500, detail=str(e))
     return {"status": "ok", "input_id": input_id, **result}
 
 
 @router.patch("/config/inputs/{input_id}")
-async def update_input(request: Request, input_id: str, data: InputUpdate):
+async def update_input(request: Request, input_id: str, data: InputUpdate, config_svc: ConfigDep):
     """Update an input's editable fields and re-apply if anything changed."""
-    config_svc = get_config_service(request)
     project_dir = request.app.state.project_dir
 
     if input_id not in config_svc.get_inputs():
@@ -280,20 +284,20 @@ async def update_input(request: Request, input_id: str, data: InputUpdate):
 
     old_config = copy.deepcopy(config_svc.config)
     config_svc.update_input(input_id, partial)
+    await config_svc.asave()
     new_config = copy.deepcopy(config_svc.config)
 
     try:
         result = await apply_inputs(project_dir, old_config, new_config)
     except RuntimeError as e:
-        config_svc.save(old_config)
+        await config_svc.asave(old_config)
         raise HTTPException(status_code=500, detail=str(e))
     return {"status": "ok", "input_id": input_id, "applied": partial, **result}
 
 
 @router.delete("/config/inputs/{input_id}")
-async def delete_input(request: Request, input_id: str):
+async def delete_input(request: Request, input_id: str, config_svc: ConfigDep):
     """Remove an input: stop+disable its bridge and regenerate ALSA."""
-    config_svc = get_config_service(request)
     project_dir = request.app.state.project_dir
 
     if input_id not in config_svc.get_inputs():
@@ -301,12 +305,13 @@ async def delete_input(request: Request, input_id: str):
 
     old_config = copy.deepcopy(config_svc.config)
     config_svc.delete_input(input_id)
+    await config_svc.asave()
     new_config = copy.deepcopy(config_svc.config)
 
     try:
         result = await apply_inputs(project_dir, old_config, new_config)
     except RuntimeError as e:
-        config_svc.save(old_config)
+        await config_svc.asave(old_config)
         raise HTTPException(status_code=500, detail=str(e))
     return {"status": "ok", **result}
 
@@ -320,7 +325,7 @@ class LiveVolumeRequest(BaseModel):
 
 
 @router.post("/system/channel-volume")
-async def set_channel_volume(request: Request, data: LiveVolumeRequest):
+async def set_channel_volume(request: Request, data: LiveVolumeRequest, config_svc: ConfigDep):
     """Set a per-speaker softvol live AND persist the value to JSON.
 
     Volume edits don't need an Apply: ALSA's per-speaker softvol picks up the
@@ -328,28 +333,13 @@ async def set_channel_volume(request: Request, data: LiveVolumeRequest):
     speaker_config.json so reloads / regens see the updated value. No ALSA
     regen, no sendspin restart — just instant + saved.
     """
-    config_svc = get_config_service(request)
 
     # Find the speaker for (amp, channel)
-    target = None
-    spk_id_match = None
-    for rid, room in config_svc.get_rooms().items():
-        for side in ("left", "right", "sub", "mono"):
-            spk_id = room.get(side)
-            if not spk_id:
-                continue
-            spk = config_svc.get_speakers().get(spk_id)
-            if not spk:
-                continue
-            if spk.get("amplifier") == data.amp and int(spk.get("channel", -1)) == int(data.channel):
-                target = {"room": rid, "side": side, "card": data.amp}
-                spk_id_match = spk_id
-                break
-        if target:
-            break
-
-    if not target:
+    assignment = config_svc.get_channel_assignment(data.amp, data.channel)
+    if not assignment or not assignment["room"]:
         raise HTTPException(status_code=404, detail="No speaker assigned to that channel")
+    target = {"room": assignment["room"], "side": assignment["position"], "card": data.amp}
+    spk_id_match = assignment["speaker"]
 
     # Honor the per-room max_volume ceiling (falls back to global) so a channel
     # fader can't exceed its room's configured maximum.
@@ -364,6 +354,7 @@ async def set_channel_volume(request: Request, data: LiveVolumeRequest):
     # Persist to JSON so the value survives reloads / future regens
     if spk_id_match:
         config_svc.set_speaker_volume(spk_id_match, data.volume)
+        await config_svc.asave()
 
     return {"status": "ok", "control": ctrl, "amixer_pct": pct, "saved": bool(spk_id_match)}
 
@@ -375,17 +366,17 @@ class RoomMaxVolume(BaseModel):
 
 
 @router.post("/config/rooms/{room_id}/max-volume")
-async def set_room_max_volume(request: Request, room_id: str, data: RoomMaxVolume):
+async def set_room_max_volume(request: Request, room_id: str, data: RoomMaxVolume, config_svc: ConfigDep):
     """Set (or clear) a room's max_volume ceiling and re-seed its softvols live.
 
     Pure runtime: max_volume is applied at the softvol-seeding layer, so this
     re-seeds via amixer — no ALSA regen and no sendspin restart.
     """
-    config_svc = get_config_service(request)
     if room_id not in config_svc.get_rooms():
         raise HTTPException(status_code=404, detail="Room not found")
 
     config_svc.set_room_max_volume(room_id, data.max_volume)
+    await config_svc.asave()
     from services.apply import seed_room_softvols
     seeded = await seed_room_softvols(config_svc.config, room_id)
     effective = config_svc.get_room(room_id).get("max_volume", config_svc.get_max_volume())
@@ -408,9 +399,8 @@ class ChannelTestRequest(BaseModel):
 
 
 @router.post("/test/channel")
-async def test_channel(request: Request, data: ChannelTestRequest):
+async def test_channel(request: Request, data: ChannelTestRequest, audio_svc: AudioDep):
     """Play test sound on a channel; honors slider volume if provided."""
-    audio_svc = get_audio_service(request)
 
     if data.type == "tts":
         success = await audio_svc.play_tts(data.amplifier, data.channel, data.volume)
@@ -432,12 +422,10 @@ class RoomTestRequest(BaseModel):
 
 
 @router.post("/test/room")
-async def test_room(request: Request, data: RoomTestRequest):
+async def test_room(request: Request, data: RoomTestRequest, audio_svc: AudioDep, config_svc: ConfigDep):
     """Play test sound on a room — fans out to per-channel devices so each
     side gets its own live slider gain. Mono rooms play once on the single
     channel."""
-    audio_svc = get_audio_service(request)
-    config_svc = get_config_service(request)
 
     room = config_svc.get_room(data.room)
     if not room:
@@ -498,13 +486,12 @@ class ApplyRequest(BaseModel):
 
 
 @router.post("/config/apply")
-async def config_apply(request: Request, data: ApplyRequest):
+async def config_apply(request: Request, data: ApplyRequest, config_svc: ConfigDep):
     """Atomically write new speakers+rooms config and run the apply pipeline.
 
     Steps: write speaker_config.json, regenerate /etc/asound.conf, restart
     sendspin services for rooms whose effective channel mapping changed.
     """
-    config_svc = get_config_service(request)
     project_dir = request.app.state.project_dir
 
     old_config = copy.deepcopy(config_svc.config)
@@ -557,14 +544,14 @@ async def config_apply(request: Request, data: ApplyRequest):
         new_config.setdefault("global", {})["max_volume"] = v
 
     # Persist to disk (creates a .bak)
-    config_svc.save(new_config)
+    await config_svc.asave(new_config)
 
     # Run apply pipeline
     try:
         result = await apply_config(project_dir, old_config, new_config)
     except RuntimeError as e:
         # Roll back on apply failure
-        config_svc.save(old_config)
+        await config_svc.asave(old_config)
         raise HTTPException(status_code=500, detail=str(e))
 
     return {"status": "ok", **result}
@@ -572,29 +559,49 @@ async def config_apply(request: Request, data: ApplyRequest):
 
 # === System ===
 
-@router.get("/system/services")
-async def get_services(request: Request):
-    """Get status of system services"""
-    import asyncio
+class _PollCache:
+    """Reuse a polled status for `ttl` seconds, with one fetch in flight.
 
-    services = ['powermanager']
+    Every open tab polls the status endpoints; within the TTL they share
+    one round of subprocesses instead of each spawning their own. Entries
+    are keyed by the fetch's inputs (unit names, GPIO map), so a config
+    change is picked up at once. Cached values are shared: don't mutate.
+    """
 
-    # Get sendspin services for each room
-    config_svc = get_config_service(request)
-    for room_id in config_svc.get_rooms().keys():
-        services.append(f'sendspin@room_{room_id}')
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = asyncio.Lock()
+        self._key = None
+        self._stamp = float('-inf')
+        self._value = None
 
-    results = {}
-    for service in services:
-        proc = await asyncio.create_subprocess_exec(
-            'systemctl', 'is-active', service,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.DEVNULL
-        )
-        stdout, _ = await proc.communicate()
-        results[service] = stdout.decode().strip()
+    def _fresh(self, key) -> bool:
+        return key == self._key and time.monotonic() - self._stamp < self.ttl
+
+    async def get(self, key, fetch):
+        if self._fresh(key):
+            return self._value
+        async with self._lock:
+            if not self._fresh(key):  # another request may have fetched it meanwhile
+                self._value = await fetch()
+                self._key, self._stamp = key, time.monotonic()
+            return self._value
 
-    return results
+    def clear(self) -> None:
+        self._key = None
+
+
+_services_cache = _PollCache(ttl=1.0)
+_amp_states_cache = _PollCache(ttl=1.0)
+
+
+@router.get("/system/services")
+async def get_services(request: Request, config_svc: ConfigDep):
+    """Get status of system services"""
+    # powermanager plus the sendspin service of each room
+    services = ('powermanager', *[f'sendspin@room_{room_id}' for room_id in config_svc.get_rooms()])
+
+    return await _services_cache.get(services, lambda: systemctl_is_active(services))
 
 
 class AmpControlRequest(BaseModel):
@@ -605,7 +612,6 @@ class AmpControlRequest(BaseModel):
 @router.post("/system/amp")
 async def control_amp(request: Request, data: AmpControlRequest):
     """Control individual amplifier via ampctl"""
-    import asyncio
 
     proc = await asyncio.create_subprocess_exec(
         'ampctl', data.state, data.amp,
@@ -613,6 +619,7 @@ async def control_amp(request: Request, data: AmpControlRequest):
         stderr=asyncio.subprocess.PIPE
     )
     _, stderr = await proc.communicate()
+    _amp_states_cache.clear()  # the next status poll must see the switch
 
     if proc.returncode != 0:
         raise HTTPException(status_code=500, detail=f"ampctl failed: {stderr.decode()}")
@@ -620,44 +627,56 @@ async def control_amp(request: Request, data: AmpControlRequest):
     return {"status": "ok", "amp": data.amp, "state": data.state}
 
 
-@router.get("/system/powermanager")
-async def get_powermanager_status(request: Request):
-    """Get per-amp power status via ampctl and ALSA activity"""
-    import asyncio
-    import json as jsonlib
+async def _amp_power_states(amplifiers: dict) -> dict[str, str]:
+    """Per-amp "on"/"off"/"unknown", as `ampctl status` reports it.
 
-    amps = {}
+    ampctl starts a python3 per amp just to look up its GPIO; the config is
+    already loaded here, so read every SHDN line with a single pinctrl call.
+    Amps without a gpio are always on.
+    """
+    gpios = {
+        amp_id: amp["gpio"] for amp_id, amp in amplifiers.items()
+        if isinstance(amp.get("gpio"), int)
+    }
+    states = {amp_id: "on" for amp_id in amplifiers}
+    if not gpios:
+        return states
 
-    # Get all amp states in one call
-    proc = await asyncio.create_subprocess_exec(
-        'ampctl', 'status',
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.DEVNULL
-    )
-    stdout, _ = await proc.communicate()
+    levels = {}
     try:
-        states = jsonlib.loads(stdout.decode())
-    except Exception:
-        states = {}
+        proc = await asyncio.create_subprocess_exec(
+            'pinctrl', 'get', ','.join(str(g) for g in sorted(set(gpios.values()))),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        stdout, _ = await proc.communicate()
+    except OSError:
+        stdout = b""
+    # One line per pin, e.g. "17: op -- pd | hi // GPIO17 = output"
+    for line in stdout.decode().splitlines():
+        pin, _, rest = line.partition(':')
+        if pin.strip().isdigit():
+            levels[int(pin)] = "on" if "| hi" in rest else "off" if "| lo" in rest else "unknown"
 
-    for amp in ["amp1", "amp2", "amp3"]:
-        amp_info = {"state": states.get(amp, "unknown"), "audio_active": False}
+    for amp_id, gpio in gpios.items():
+        states[amp_id] = levels.get(gpio, "unknown")
+    return states
 
-        # Check ALSA activity
-        try:
-            status_file = f'/proc/asound/{amp}/pcm0p/sub0/status'
-            proc = await asyncio.create_subprocess_exec(
-                'cat', status_file,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.DEVNULL
-            )
-            stdout, _ = await proc.communicate()
-            if 'state: RUNNING' in stdout.decode():
-                amp_info["audio_active"] = True
-        except Exception:
-            pass
 
-        amps[amp] = amp_info
+@router.get("/system/powermanager")
+async def get_powermanager_status(request: Request, config_svc: ConfigDep):
+    """Get per-amp power status from the SHDN GPIOs and ALSA activity"""
+    amps = {}
+    amplifiers = config_svc.get_amplifiers()
+    gpios = tuple((amp_id, amp.get("gpio")) for amp_id, amp in amplifiers.items())
+    states = await _amp_states_cache.get(gpios, lambda: _amp_power_states(amplifiers))
+
+    for amp in ["amp1", "amp2", "amp3"]:
+        amps[amp] = {
+            "state": states.get(amp, "unknown"),
+            # ALSA activity, straight from procfs
+            "audio_active": _pcm_running(amp, "pcm0p"),
+        }
 
     return {"amps": amps}
 
@@ -665,22 +684,16 @@ async def get_powermanager_status(request: Request):
 # === Sendspin status ===
 
 @router.get("/system/sendspin")
-async def get_sendspin_status(request: Request):
+async def get_sendspin_status(request: Request, config_svc: ConfigDep):
     """Get sendspin client status for all rooms"""
-    import asyncio
-
-    config_svc = get_config_service(request)
     clients = {}
 
-    for room_id in config_svc.get_rooms().keys():
+    room_ids = list(config_svc.get_rooms().keys())
+    states = await systemctl_is_active([f'sendspin@room_{room_id}' for room_id in room_ids])
+
+    for room_id in room_ids:
         service = f'sendspin@room_{room_id}'
-        proc = await asyncio.create_subprocess_exec(
-            'systemctl', 'is-active', service,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.DEVNULL
-        )
-        stdout, _ = await proc.communicate()
-        status = stdout.decode().strip()
+        status = states[service]
 
         clients[room_id] = {
             "service": service,
@@ -694,38 +707,20 @@ async def get_sendspin_status(request: Request):
 # === Input runtime status ===
 
 @router.get("/system/inputs")
-async def get_input_status(request: Request):
+async def get_input_status(request: Request, config_svc: ConfigDep):
     """Per-input runtime status: is the lineinpipe bridge active, and is the
     capture device actually running (PCM state RUNNING)?"""
-    import asyncio
-
-    config_svc = get_config_service(request)
     inputs = {}
 
-    for input_id, inp in config_svc.get_inputs().items():
+    input_cfgs = config_svc.get_inputs()
+    states = await systemctl_is_active([f"lineinpipe@{input_id}.service" for input_id in input_cfgs])
+
+    for input_id, inp in input_cfgs.items():
         unit = f"lineinpipe@{input_id}.service"
-        proc = await asyncio.create_subprocess_exec(
-            'systemctl', 'is-active', unit,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.DEVNULL,
-        )
-        stdout, _ = await proc.communicate()
-        status = stdout.decode().strip()
+        status = states[unit]
 
-        capturing = False
         card = inp.get("card", input_id)
-        try:
-            status_file = f'/proc/asound/{card}/pcm0c/sub0/status'
-            proc = await asyncio.create_subprocess_exec(
-                'cat', status_file,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.DEVNULL,
-            )
-            out, _ = await proc.communicate()
-            if 'state: RUNNING' in out.decode():
-                capturing = True
-        except Exception:
-            pass
+        capturing = _pcm_running(card, "pcm0c")
 
         inputs[input_id] = {
             "service": unit,
@@ -745,12 +740,10 @@ class InputTestRequest(BaseModel):
 
 
 @router.post("/test/input/{input_id}")
-async def test_input(request: Request, input_id: str, data: InputTestRequest):
+async def test_input(request: Request, input_id: str, data: InputTestRequest, config_svc: ConfigDep):
     """Capture a short sample from the input and play it into a room so the user
     can confirm the line-in is live. Routes input_<id> → room_<room>/all_rooms."""
-    import asyncio
 
-    config_svc = get_config_service(request)
     if input_id not in config_svc.get_inputs():
         raise HTTPException(status_code=404, detail="Input not found")
 
@@ -766,8 +759,9 @@ async def test_input(request: Request, input_id: str, data: InputTestRequest):
     )
     proc = await asyncio.create_subprocess_shell(cmd)
     try:
-        await asyncio.wait_for(proc.wait(), timeout=seconds + 5)
-    except asyncio.TimeoutError:
+        async with asyncio.timeout(seconds + 5):
+            await proc.wait()
+    except TimeoutError:
         proc.kill()
         raise HTTPException(status_code=500, detail="Test capture/playback timed out")
 
@@ -788,6 +782,11 @@ def _read_file(path: str) -> str:
         return ""
 
 
+def _pcm_running(card: str, pcm: str) -> bool:
+    """True if the card's first substream of `pcm` (pcm0p / pcm0c) is RUNNING."""
+    return 'state: RUNNING' in _read_file(f'/proc/asound/{card}/{pcm}/sub0/status')
+
+
 def _cpu_times():
     """(total, idle) jiffies from /proc/stat first line, or None."""
     line = _read_file("/proc/stat").splitlines()
@@ -805,7 +804,6 @@ def _cpu_times():
 @router.get("/system/metrics")
 async def system_metrics(request: Request):
     """Live host metrics for the System tab (temp, CPU%, memory, load, throttle)."""
-    import asyncio
 
     # CPU temperature
     temp_c = None
@@ -868,7 +866,6 @@ async def system_metrics(request: Request):
 @router.get("/system/lox")
 async def lox_status(request: Request):
     """lox-audioserver Docker container status."""
-    import asyncio
     import json as jsonlib
 
     proc = await asyncio.create_subprocess_exec(
@@ -897,7 +894,6 @@ async def lox_status(request: Request):
 @router.post("/system/lox/restart")
 async def lox_restart(request: Request):
     """Restart the lox-audioserver container."""
-    import asyncio
 
     proc = await asyncio.create_subprocess_exec(
         "docker", "restart", "lox-audioserver",
@@ -1,6 +1,9 @@
 """Page routes — single-page rack UI."""
 
-from fastapi import APIRouter, Request
+import asyncio
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Request
 from fastapi.responses import HTMLResponse
 
 from services.config import ConfigService
@@ -10,16 +13,19 @@ router = APIRouter(tags=["pages"])
 
 
 def get_config_service(request: Request) -> ConfigService:
-    return ConfigService(request.app.state.config_file)
+    return request.app.state.config_service
+
+
+ConfigDep = Annotated[ConfigService, Depends(get_config_service)]
 
 
 @router.get("/", response_class=HTMLResponse)
-async def rack(request: Request):
+async def rack(request: Request, config_svc: ConfigDep):
     """The whole UI: a single rack with status, patch panel, and amp modules."""
-    config_svc = get_config_service(request)
     templates = request.app.state.templates
 
-    cards = detect_cards()
+    # Card detection shells out to udevadm per card; keep it off the event loop
+    cards = await asyncio.to_thread(detect_cards)
     amps = []
     for amp_id, amp in config_svc.get_amplifiers().items():
         # Match the physical card by its ALSA short id (amp.card), which is what
@@ -1,7 +1,7 @@
 """Apply pipeline: regenerate ALSA config + restart affected sendspin services.
 
 Pipeline (after the new speaker_config.json has been written to disk):
-  1. Run generate_alsa_config.py → capture stdout
+  1. Render the ALSA config with generate_alsa_config.py (in-process)
   2. Compare to current /etc/asound.conf; if changed, sudo-write new file
   3. Seed every per-speaker softvol with its volume via amixer (so the live
      control reflects the saved value after install)
@@ -11,8 +11,12 @@ Pipeline (after the new speaker_config.json has been written to disk):
 """
 
 import asyncio
+import importlib.util
+import io
+import json
 import math
 import tempfile
+from functools import lru_cache
 from pathlib import Path
 
 
@@ -111,18 +115,37 @@ async def apply_inputs(project_dir: Path, old_config: dict, new_config: dict) ->
     return {"alsa_changed": alsa_changed, "input_services": input_services}
 
 
+@lru_cache(maxsize=1)
+def _alsa_generator(path: Path, mtime_ns: int):
+    """Import generate_alsa_config.py. Cached per file version: an updated
+    script (new mtime) is re-imported on the next apply, no restart needed."""
+    spec = importlib.util.spec_from_file_location("generate_alsa_config", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _render_alsa(project_dir: Path) -> str:
+    path = project_dir / "generate_alsa_config.py"
+    generator = _alsa_generator(path, path.stat().st_mtime_ns)
+    with open(project_dir / "speaker_config.json", "rb") as f:
+        config = json.loads(f.read())
+    # Same check the CLI's load_config() applies: refuse a v1 config
+    generator.check_config_version(config)
+    # Progress output is only useful on a terminal; drop it here
+    return generator.generate_alsa_config(config, log=io.StringIO())
+
+
 async def regenerate_alsa(project_dir: Path) -> str:
-    """Run generate_alsa_config.py and return its stdout."""
-    proc = await asyncio.create_subprocess_exec(
-        "python3", str(project_dir / "generate_alsa_config.py"),
-        cwd=str(project_dir),
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
-    stdout, stderr = await proc.communicate()
-    if proc.returncode != 0:
-        raise RuntimeError(f"generate_alsa_config.py failed: {stderr.decode().strip()}")
-    return stdout.decode()
+    """Render asound.conf from speaker_config.json and return it.
+
+    The generator is imported and called directly (in a worker thread) instead
+    of spawning a fresh `python3` for every apply.
+    """
+    try:
+        return await asyncio.to_thread(_render_alsa, project_dir)
+    except Exception as e:
+        raise RuntimeError(f"generate_alsa_config.py failed: {e}") from e
 
 
 async def write_asound_conf(content: str, target: str = "/etc/asound.conf") -> bool:
@@ -177,6 +200,24 @@ async def systemctl_action(action: str, units: list[str]) -> dict[str, str]:
     return dict(await asyncio.gather(*(one(u) for u in units)))
 
 
+async def systemctl_is_active(units: list[str]) -> dict[str, str]:
+    """`systemctl is-active` for all units in one call → {unit: state}.
+
+    systemctl prints one state line per unit, in argument order.
+    """
+    if not units:
+        return {}
+    proc = await asyncio.create_subprocess_exec(
+        "systemctl", "is-active", *units,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    out, _ = await proc.communicate()
+    states = out.decode().splitlines()
+    states += [""] * (len(units) - len(states))
+    return {unit: state.strip() for unit, state in zip(units, states)}
+
+
 async def restart_services(units: list[str]) -> dict[str, str]:
     return await systemctl_action("restart", units)
 
@@ -241,12 +282,14 @@ async def prime_softvol_pcm(pcm_name: str) -> None:
     )
     proc = await asyncio.create_subprocess_shell(cmd)
     try:
-        await asyncio.wait_for(proc.wait(), timeout=2.0)
-    except asyncio.TimeoutError:
+        async with asyncio.timeout(2.0):
+            await proc.wait()
+    except TimeoutError:
         proc.terminate()
         try:
-            await asyncio.wait_for(proc.wait(), timeout=1.0)
-        except asyncio.TimeoutError:
+            async with asyncio.timeout(1.0):
+                await proc.wait()
+        except TimeoutError:
             proc.kill()
 
 
@@ -386,14 +429,7 @@ async def apply_config(project_dir: Path, old_config: dict, new_config: dict) ->
     async def partition_by_state(units: list[str]) -> tuple[list[str], list[str]]:
         known: list[str] = []
         unknown: list[str] = []
-        for unit in units:
-            proc = await asyncio.create_subprocess_exec(
-                "systemctl", "is-active", unit,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.DEVNULL,
-            )
-            out, _ = await proc.communicate()
-            state = out.decode().strip()
+        for unit, state in (await systemctl_is_active(units)).items():
             (known if state and state != "unknown" else unknown).append(unit)
         return known, unknown
 
@@ -7,6 +7,7 @@ restart sendspin services).
 """
 
 import asyncio
+import hashlib
 import os
 import tempfile
 from pathlib import Path
@@ -14,9 +15,15 @@ from typing import Optional
 
 
 class AudioService:
+    # Cap on simultaneous aplay (+ sox) pipelines across all requests, so a
+    # burst of test clicks queues instead of thrashing the USB audio devices.
+    _MAX_PLAYBACKS = 8
+
     def __init__(self, project_dir: Path):
         self.project_dir = project_dir
         self.chime_path = project_dir / "webui" / "static" / "sounds" / "test_chime.wav"
+        self.tts_cache_dir = project_dir / "webui" / "cache" / "tts"
+        self._playback_slots = asyncio.Semaphore(self._MAX_PLAYBACKS)
 
     # ------------------------------------------------------------------
     # Internal helpers
@@ -71,6 +78,14 @@ class AudioService:
     async def _play_file(self, device: str, source_path: Path, gain: Optional[float]) -> bool:
         """Play a wav file through `aplay -D <device>`, optionally pre-scaled by sox.
 
+        At most _MAX_PLAYBACKS of these run at once; further calls wait.
+        """
+        async with self._playback_slots:
+            return await self._play_file_now(device, source_path, gain)
+
+    async def _play_file_now(self, device: str, source_path: Path, gain: Optional[float]) -> bool:
+        """_play_file() without the cap.
+
         Uses an OS pipe (sox stdout fd → aplay stdin fd) so the two processes
         stream like a shell pipe; asyncio's PIPE-wrapped StreamReader can't be
         passed directly as another subprocess's stdin.
@@ -116,23 +131,42 @@ class AudioService:
         except Exception:
             return False
 
-    async def _generate_tts(self, text: str) -> Optional[str]:
-        """Generate a temp WAV via espeak-ng and return its path, or None on failure."""
+    # espeak-ng voice for all announcements
+    _TTS_VOICE = "de"
+
+    async def _generate_tts(self, text: str) -> Optional[Path]:
+        """Return a WAV of `text` spoken by espeak-ng, or None on failure.
+
+        Announcements are a small fixed set (amp/channel and room names), so
+        each is rendered once and kept under webui/cache/tts, keyed by voice
+        and text. A new file is written next to its final name and renamed
+        into place, so concurrent requests never see a partial WAV.
+        """
+        key = hashlib.sha1(f"{self._TTS_VOICE}|{text}".encode()).hexdigest()
+        cache_path = self.tts_cache_dir / f"{key}.wav"
+        if cache_path.exists():
+            return cache_path
+        temp_path = None
         try:
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-                temp_path = f.name
+            self.tts_cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(suffix=".wav", dir=self.tts_cache_dir)
+            os.close(fd)
             proc = await asyncio.create_subprocess_exec(
-                "espeak-ng", "-v", "de", "-w", temp_path, text,
+                "espeak-ng", "-v", self._TTS_VOICE, "-w", temp_path, text,
                 stdout=asyncio.subprocess.DEVNULL,
                 stderr=asyncio.subprocess.DEVNULL,
             )
             await proc.wait()
             if proc.returncode != 0:
-                Path(temp_path).unlink(missing_ok=True)
                 return None
-            return temp_path
+            os.replace(temp_path, cache_path)
+            temp_path = None
+            return cache_path
         except Exception:
             return None
+        finally:
+            if temp_path:
+                Path(temp_path).unlink(missing_ok=True)
 
     # ------------------------------------------------------------------
     # Public API
@@ -147,15 +181,12 @@ class AudioService:
     async def play_tts(self, amplifier: str, channel: int, volume_pct: Optional[int] = None) -> bool:
         text = f"Verstärker {amplifier[-1]}, Kanal {channel}"
         device = f"{amplifier}_ch{channel}"
-        temp_path = await self._generate_tts(text)
-        if not temp_path:
+        wav_path = await self._generate_tts(text)
+        if not wav_path:
             return False
-        try:
-            await self._ensure_amp_on(amplifier)
-            await asyncio.sleep(self._AMP_SETTLE_SEC)
-            return await self._play_file(device, Path(temp_path), self._gain_or_none(volume_pct))
-        finally:
-            Path(temp_path).unlink(missing_ok=True)
+        await self._ensure_amp_on(amplifier)
+        await asyncio.sleep(self._AMP_SETTLE_SEC)
+        return await self._play_file(device, wav_path, self._gain_or_none(volume_pct))
 
     async def play_room_stereo(
         self,
@@ -172,34 +203,27 @@ class AudioService:
         """
         # Generate the source file once
         source: Optional[Path] = None
-        cleanup = False
         if sound == "tts":
             speak = text or "Test"
-            tmp = await self._generate_tts(speak)
-            if not tmp:
+            source = await self._generate_tts(speak)
+            if not source:
                 return False
-            source = Path(tmp)
-            cleanup = True
         else:
             source = self.chime_path
 
-        try:
-            # Power on every distinct amp involved in this room (handles
-            # cross-device stereo where left/right live on different amps).
-            amps_to_wake = {a for a in (left_amp, right_amp) if a}
-            if amps_to_wake:
-                await asyncio.gather(*(self._ensure_amp_on(a) for a in amps_to_wake))
-                await asyncio.sleep(self._AMP_SETTLE_SEC)
-
-            tasks = []
-            if left_amp and left_ch:
-                tasks.append(self._play_file(f"{left_amp}_ch{left_ch}", source, self._gain_or_none(left_volume_pct)))
-            if right_amp and right_ch:
-                tasks.append(self._play_file(f"{right_amp}_ch{right_ch}", source, self._gain_or_none(right_volume_pct)))
-            if not tasks:
-                return True  # nothing to play is not an error — user just hasn't wired the room yet
-            results = await asyncio.gather(*tasks)
-            return all(results)
-        finally:
-            if cleanup and source:
-                source.unlink(missing_ok=True)
+        # Power on every distinct amp involved in this room (handles
+        # cross-device stereo where left/right live on different amps).
+        amps_to_wake = {a for a in (left_amp, right_amp) if a}
+        if amps_to_wake:
+            await asyncio.gather(*(self._ensure_amp_on(a) for a in amps_to_wake))
+            await asyncio.sleep(self._AMP_SETTLE_SEC)
+
+        tasks = []
+        if left_amp and left_ch:
+            tasks.append(self._play_file(f"{left_amp}_ch{left_ch}", source, self._gain_or_none(left_volume_pct)))
+        if right_amp and right_ch:
+            tasks.append(self._play_file(f"{right_amp}_ch{right_ch}", source, self._gain_or_none(right_volume_pct)))
+        if not tasks:
+            return True  # nothing to play is not an error — user just hasn't wired the room yet
+        results = await asyncio.gather(*tasks)
+        return all(results)
@@ -1,41 +1,235 @@
 """Configuration service - loads and saves speaker_config.json"""
 
+import asyncio
 import json
+import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Any
 import shutil
+import tempfile
 from datetime import datetime
 
+# orjson encodes/decodes several times faster; the stdlib is the fallback.
+# Both produce the same 2-space-indented UTF-8 file.
+try:
+    import orjson
+
+    _loads = orjson.loads
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode()
+
+
+# Top-level sections the accessors index directly; load() creates any that
+# are missing (or null) as empty dicts
+_SECTIONS = ('global', 'amplifiers', 'inputs', 'speakers', 'rooms', 'zones')
+
+
+def _ensure_sections(config: dict) -> dict:
+    for key in _SECTIONS:
+        if config.get(key) is None:
+            config[key] = {}
+    return config
+
+
+def _channel_key(speaker: dict | None) -> tuple[str, int] | None:
+    """(amplifier, channel) of a speaker entry, or None if either is unusable."""
+    if not speaker or speaker.get('amplifier') is None:
+        return None
+    try:
+        return speaker['amplifier'], int(speaker.get('channel'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _stat_key(path: Path) -> tuple[int, int]:
+    st = path.stat()
+    return st.st_mtime_ns, st.st_size
+
+
+def _write_temp(path: Path, data: bytes) -> str:
+    """Write `data` to a new uniquely named temp file next to `path` and fsync
+    it, ready to be renamed over `path`. Returns the temp file's path."""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.stem}.',
+                                    suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            # mkstemp creates the file 0600; keep the config's own mode
+            try:
+                os.fchmod(f.fileno(), path.stat().st_mode & 0o777)
+            except FileNotFoundError:
+                os.fchmod(f.fileno(), 0o644)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return tmp_path
+
 
 class ConfigService:
-    def __init__(self, config_file: Path):
+    def __init__(self, config_file: Path, autosave: bool = True):
         self.config_file = config_file
+        # False: mutators only mark the config dirty and the caller persists
+        # it with save() / asave() (the web app does the latter)
+        self.autosave = autosave
         self._config: dict | None = None
+        # (mtime_ns, size) of the file _config was read from / written to
+        self._loaded_key: tuple[int, int] | None = None
+        # Exactly what save() last wrote, to skip rewriting identical content
+        self._saved: bytes | None = None
+        # Inside batched() (or without autosave): mutators only mark the
+        # config dirty
+        self._in_batch = False
+        self._dirty = False
+        # Reverse lookups over speakers/rooms, built on first use and dropped
+        # whenever the config is reloaded or mutated
+        self._index: dict | None = None
+        # asave(): one writer thread at a time; saves requested while one is
+        # running collapse into a single follow-up write
+        self._write_lock = threading.Lock()
+        self._save_lock = asyncio.Lock()
+        self._save_pending = False
+        self._writing = False
 
     def load(self) -> dict:
         """Load config from file"""
-        with open(self.config_file, 'r') as f:
-            self._config = json.load(f)
+        key = _stat_key(self.config_file)
+        # One read of the raw bytes; both parsers take UTF-8 bytes directly
+        with open(self.config_file, 'rb') as f:
+            self._config = _ensure_sections(_loads(f.read()))
+        self._loaded_key = key
+        self._index = None
         return self._config
 
+    def _is_saved(self, data: bytes) -> bool:
+        """True if the file still holds exactly `data` from our last write."""
+        return (data == self._saved and self.config_file.exists()
+                and _stat_key(self.config_file) == self._loaded_key)
+
+    def _write(self, data: bytes) -> tuple[int, int]:
+        """Atomically replace the config file with `data`, keeping the previous
+        version as .bak. Returns the new file's stat key. Thread-safe."""
+        with self._write_lock:
+            # Write to a temp file that is renamed over the config, so a
+            # crash never leaves a half-written speaker_config.json. The name
+            # is unique because speaker_identify.py writes the same file.
+            tmp_path = _write_temp(self.config_file, data)
+
+            # Backup: the rename below swaps in a new inode, so a hard link to
+            # the current one preserves the previous version without copying
+            if self.config_file.exists():
+                backup_path = self.config_file.with_suffix('.json.bak')
+                backup_tmp = self.config_file.with_suffix('.json.bak.tmp')
+                try:
+                    backup_tmp.unlink(missing_ok=True)
+                    os.link(self.config_file, backup_tmp)
+                    os.replace(backup_tmp, backup_path)
+                except OSError:
+                    # No hard links on this filesystem: fall back to a copy
+                    shutil.copy(self.config_file, backup_path)
+
+            try:
+                os.replace(tmp_path, self.config_file)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            return _stat_key(self.config_file)
+
     def save(self, config: dict | None = None) -> None:
-        """Save config to file (creates backup first)"""
+        """Save config to file atomically, keeping the previous version as .bak.
+
+        A no-op if the file still holds exactly what the last save() wrote.
+        """
         if config is not None:
-            self._config = config
+            self._config = _ensure_sections(config)
+
+        # Serialise first, then one write (json.dump would issue a write()
+        # per token)
+        self._dirty = False
+        data = _dumps(self._config)
+        if self._is_saved(data):
+            return
+        self._loaded_key = self._write(data)
+        self._saved = data
+        self._index = None
+
+    async def asave(self, config: dict | None = None) -> None:
+        """save() for async callers: the file I/O runs in a worker thread so
+        the event loop isn't blocked.
+
+        Serialisation happens on the loop, so the snapshot is consistent. If a
+        write is already running, this waits for it and then writes once for
+        all changes made meanwhile (or not at all if a later save covered them).
+        """
+        if config is not None:
+            self._config = _ensure_sections(config)
+            self._index = None
+        self._save_pending = True
+        async with self._save_lock:
+            if not self._save_pending:
+                return
+            self._save_pending = False
+            self._dirty = False
+            data = _dumps(self._config)
+            if self._is_saved(data):
+                return
+            # Our own rename changes the file's stat; don't mistake it for an
+            # outside edit and reload mid-write
+            self._writing = True
+            try:
+                self._loaded_key = await asyncio.to_thread(self._write, data)
+                self._saved = data
+            finally:
+                self._writing = False
+
+    def _mark_dirty(self, reindex: bool = True) -> None:
+        """Persist a mutation now, or once at the end of the enclosing batched()
+        (without autosave: on the caller's next save()/asave()).
+
+        Pass reindex=False only for changes that can't affect the lookups in
+        _lookup() (e.g. a speaker's volume).
+        """
+        if reindex:
+            self._index = None
+        if self._in_batch or not self.autosave:
+            self._dirty = True
+        else:
+            self.save()
 
-        # Create backup
-        backup_path = self.config_file.with_suffix('.json.bak')
-        if self.config_file.exists():
-            shutil.copy(self.config_file, backup_path)
+    @contextmanager
+    def batched(self):
+        """Coalesce the saves of all mutations in the block into one write.
 
-        # Save config
-        with open(self.config_file, 'w') as f:
-            json.dump(self._config, f, indent=2, ensure_ascii=False)
+        The flush also happens if the block raises, so the file never lags
+        behind the in-memory config. Nested blocks join the outer batch.
+        """
+        if self._in_batch:
+            yield self
+            return
+        self._in_batch = True
+        try:
+            yield self
+        finally:
+            self._in_batch = False
+            if self._dirty:
+                self._dirty = False
+                self.save()
 
     @property
     def config(self) -> dict:
-        """Get current config (loads if not cached)"""
-        if self._config is None:
+        """Get current config (reloads only if the file changed on disk)"""
+        if self._config is None or (
+            not self._writing and _stat_key(self.config_file) != self._loaded_key
+        ):
             self.load()
         return self._config
 
@@ -43,25 +237,30 @@ class ConfigService:
         """Force reload from disk"""
         return self.load()
 
+    def _set_entry(self, section: str, entry_id: str, data: dict) -> None:
+        """Store `data` under config[section][entry_id]; a UI re-posting an
+        unchanged object doesn't dirty the config (no save, no reindex)."""
+        entries = self.config[section]
+        if entries.get(entry_id) != data:
+            entries[entry_id] = data
+            self._mark_dirty()
+
     # Amplifiers
     def get_amplifiers(self) -> dict:
-        return self.config.get('amplifiers', {})
+        return self.config["amplifiers"]
 
     def get_amplifier(self, amp_id: str) -> dict | None:
-        return self.get_amplifiers().get(amp_id)
+        return self.config["amplifiers"].get(amp_id)
 
     def add_amplifier(self, amp_id: str, data: dict) -> None:
-        if "amplifiers" not in self.config:
-            self.config["amplifiers"] = {}
-        self.config["amplifiers"][amp_id] = data
-        self.save()
+        self._set_entry("amplifiers", amp_id, data)
 
     def update_amplifier(self, amp_id: str, partial: dict) -> bool:
         """Merge `partial` into an existing amp's config. Returns False if amp unknown.
         Keys with value `None` are removed (so passing `{'gpio': None}` clears the
         gpio field → amp becomes always-on).
         """
-        amps = self.config.get("amplifiers") or {}
+        amps = self.config["amplifiers"]
         if amp_id not in amps:
             return False
         current = dict(amps[amp_id])
@@ -70,102 +269,92 @@ class ConfigService:
                 current.pop(k, None)
             else:
                 current[k] = v
-        amps[amp_id] = current
-        self.config["amplifiers"] = amps
-        self.save()
+        if current != amps[amp_id]:
+            amps[amp_id] = current
+            self._mark_dirty()
         return True
 
     def delete_amplifier(self, amp_id: str) -> bool:
-        if amp_id in self.config.get("amplifiers", {}):
+        if amp_id in self.config["amplifiers"]:
             del self.config["amplifiers"][amp_id]
-            self.save()
+            self._mark_dirty()
             return True
         return False
 
     # Inputs (USB capture devices)
     def get_inputs(self) -> dict:
-        return self.config.get("inputs", {})
+        return self.config["inputs"]
 
     def get_input(self, input_id: str) -> dict | None:
-        return self.get_inputs().get(input_id)
+        return self.config["inputs"].get(input_id)
 
     def add_input(self, input_id: str, data: dict) -> None:
-        if "inputs" not in self.config:
-            self.config["inputs"] = {}
-        self.config["inputs"][input_id] = data
-        self.save()
+        self._set_entry("inputs", input_id, data)
 
     def update_input(self, input_id: str, partial: dict) -> bool:
         """Merge `partial` into an existing input's config. Returns False if the
         input is unknown. Only keys present in `partial` are touched."""
-        inputs = self.config.get("inputs") or {}
+        inputs = self.config["inputs"]
         if input_id not in inputs:
             return False
         current = dict(inputs[input_id])
         current.update(partial)
-        inputs[input_id] = current
-        self.config["inputs"] = inputs
-        self.save()
+        if current != inputs[input_id]:
+            inputs[input_id] = current
+            self._mark_dirty()
         return True
 
     def delete_input(self, input_id: str) -> bool:
-        if input_id in self.config.get("inputs", {}):
+        if input_id in self.config["inputs"]:
             del self.config["inputs"][input_id]
-            self.save()
+            self._mark_dirty()
             return True
         return False
 
     # Speakers
     def get_speakers(self) -> dict:
-        return self.config.get('speakers', {})
+        return self.config['speakers']
 
     def get_speaker(self, speaker_id: str) -> dict | None:
-        return self.get_speakers().get(speaker_id)
+        return self.config['speakers'].get(speaker_id)
 
     def update_speaker(self, speaker_id: str, data: dict) -> None:
-        if 'speakers' not in self.config:
-            self.config['speakers'] = {}
-        self.config['speakers'][speaker_id] = data
-        self.save()
+        self._set_entry('speakers', speaker_id, data)
 
     def set_speaker_volume(self, speaker_id: str, volume: int) -> bool:
-        spk = self.config.get('speakers', {}).get(speaker_id)
+        spk = self.config['speakers'].get(speaker_id)
         if not spk:
             return False
-        spk['volume'] = max(0, min(100, int(volume)))
-        self.save()
+        volume = max(0, min(100, int(volume)))
+        if spk.get('volume') != volume:
+            spk['volume'] = volume
+            self._mark_dirty(reindex=False)
         return True
 
     def delete_speaker(self, speaker_id: str) -> bool:
-        if speaker_id in self.config.get('speakers', {}):
+        if speaker_id in self.config['speakers']:
             del self.config['speakers'][speaker_id]
-            self.save()
+            self._mark_dirty()
             return True
         return False
 
     # Rooms
     def get_rooms(self) -> dict:
-        return self.config.get('rooms', {})
+        return self.config['rooms']
 
     def get_room(self, room_id: str) -> dict | None:
-        return self.get_rooms().get(room_id)
+        return self.config['rooms'].get(room_id)
 
     def create_room(self, room_id: str, data: dict) -> None:
-        if 'rooms' not in self.config:
-            self.config['rooms'] = {}
-        self.config['rooms'][room_id] = data
-        self.save()
+        self._set_entry('rooms', room_id, data)
 
     def update_room(self, room_id: str, data: dict) -> None:
-        if 'rooms' not in self.config:
-            self.config['rooms'] = {}
-        self.config['rooms'][room_id] = data
-        self.save()
+        self._set_entry('rooms', room_id, data)
 
     def delete_room(self, room_id: str) -> bool:
-        if room_id in self.config.get('rooms', {}):
+        if room_id in self.config['rooms']:
             del self.config['rooms'][room_id]
-            self.save()
+            self._mark_dirty()
             return True
         return False
 
@@ -177,80 +366,106 @@ class ConfigService:
 
     def set_room_max_volume(self, room_id: str, value: float | None) -> bool:
         """Set (or clear, with None) a room's max_volume override."""
-        rooms = self.config.get('rooms', {})
+        rooms = self.config['rooms']
         if room_id not in rooms:
             return False
-        if value is None:
-            rooms[room_id].pop('max_volume', None)
-        else:
-            rooms[room_id]['max_volume'] = max(0.0, min(1.0, float(value)))
-        self.save()
+        if value is not None:
+            value = max(0.0, min(1.0, float(value)))
+        if rooms[room_id].get('max_volume') != value:
+            if value is None:
+                rooms[room_id].pop('max_volume')
+            else:
+                rooms[room_id]['max_volume'] = value
+            self._mark_dirty()
         return True
 
     # Zones
     def get_zones(self) -> dict:
-        return self.config.get('zones', {})
+        return self.config['zones']
 
     def get_zone(self, zone_id: str) -> dict | None:
-        return self.get_zones().get(zone_id)
+        return self.config['zones'].get(zone_id)
 
     def create_zone(self, zone_id: str, data: dict) -> None:
-        if 'zones' not in self.config:
-            self.config['zones'] = {}
-        self.config['zones'][zone_id] = data
-        self.save()
+        self._set_entry('zones', zone_id, data)
 
     def update_zone(self, zone_id: str, data: dict) -> None:
-        if 'zones' not in self.config:
-            self.config['zones'] = {}
-        self.config['zones'][zone_id] = data
-        self.save()
+        self._set_entry('zones', zone_id, data)
 
     def delete_zone(self, zone_id: str) -> bool:
-        if zone_id in self.config.get('zones', {}):
+        if zone_id in self.config['zones']:
             del self.config['zones'][zone_id]
-            self.save()
+            self._mark_dirty()
             return True
         return False
 
     # Global settings
     def get_global(self) -> dict:
-        return self.config.get('global', {})
+        return self.config['global']
 
     def update_global(self, data: dict) -> None:
-        self.config['global'] = data
-        self.save()
+        if self.config['global'] != data:
+            self.config['global'] = data
+            self._mark_dirty()
 
     def get_max_volume(self) -> float:
-        return self.get_global().get('max_volume', 0.5)
+        return self.config['global'].get('max_volume', 0.5)
 
     def set_max_volume(self, value: float) -> None:
-        if 'global' not in self.config:
-            self.config['global'] = {}
-        self.config['global']['max_volume'] = value
-        self.save()
+        if self.config['global'].get('max_volume') != value:
+            self.config['global']['max_volume'] = value
+            self._mark_dirty()
 
     # Channel mapping helpers
+    def _lookup(self) -> dict:
+        """Reverse indexes: (amp, channel) → speaker, speaker → (room, side),
+        zone → rooms. First match wins, as in a linear scan.
+
+        A channel resolves to the speaker a room uses (rooms and sides in
+        order) before any unassigned speaker entry on the same channel, so a
+        stale leftover can't shadow the live one. Speakers whose channel
+        isn't an integer are left out.
+        """
+        config = self.config  # may reload from disk, which drops the index
+        if self._index is None:
+            speakers = config['speakers']
+            room_by_speaker: dict[str, tuple[str, str]] = {}
+            rooms_by_zone: dict[str, list[str]] = {}
+            for room_id, room in config['rooms'].items():
+                for side in ('left', 'right', 'sub', 'mono'):
+                    if room.get(side):
+                        room_by_speaker.setdefault(room[side], (room_id, side))
+                for zone_id in room.get('zones', []):
+                    rooms_by_zone.setdefault(zone_id, []).append(room_id)
+            speaker_by_channel: dict[tuple[str, int], str] = {}
+            # Room-assigned speakers first (dicts keep insertion order), then the rest
+            for speaker_id in [*room_by_speaker, *speakers]:
+                key = _channel_key(speakers.get(speaker_id))
+                if key is not None:
+                    speaker_by_channel.setdefault(key, speaker_id)
+            self._index = {
+                'speaker_by_channel': speaker_by_channel,
+                'room_by_speaker': room_by_speaker,
+                'rooms_by_zone': rooms_by_zone,
+            }
+        return self._index
+
     def get_channel_assignment(self, amp_id: str, channel: int) -> dict | None:
         """Find which speaker/room uses this channel"""
-        for speaker_id, speaker in self.get_speakers().items():
-            if speaker.get('amplifier') == amp_id and speaker.get('channel') == channel:
-                # Find which room uses this speaker
-                for room_id, room in self.get_rooms().items():
-                    for side in ('left', 'right', 'sub', 'mono'):
-                        if room.get(side) == speaker_id:
-                            return {'speaker': speaker_id, 'room': room_id, 'position': side, 'room_name': room.get('name', room_id)}
-                return {'speaker': speaker_id, 'room': None, 'position': None, 'room_name': None}
-        return None
+        index = self._lookup()
+        speaker_id = index['speaker_by_channel'].get((amp_id, int(channel)))
+        if speaker_id is None:
+            return None
+        hit = index['room_by_speaker'].get(speaker_id)
+        if hit is None:
+            return {'speaker': speaker_id, 'room': None, 'position': None, 'room_name': None}
+        room_id, side = hit
+        room = self.get_rooms()[room_id]
+        return {'speaker': speaker_id, 'room': room_id, 'position': side, 'room_name': room.get('name', room_id)}
 
     def get_rooms_in_zone(self, zone_id: str) -> list[str]:
         """Get all room IDs that belong to a zone"""
         zone = self.get_zone(zone_id)
         if zone and zone.get('include_all'):
             return list(self.get_rooms().keys())
-
-        rooms = []
-        for room_id, room in self.get_rooms().items():
-            if zone_id in room.get('zones', []):
-                rooms.append(room_id)
-        return rooms
+        return list(self._lookup()['rooms_by_zone'].get(zone_id, ()))